@@ -12,12 +12,23 @@ across America's most innovative companies.
 import streamlit as st
 import pandas as pd
 import json
+import logging
+import os
+import threading
+import uuid
 from pathlib import Path
 import plotly.express as px
 import plotly.graph_objects as go
 import pydeck as pdk
-import anthropic
-from utils.chatbot import CompanySearchEngine, format_company_context, create_system_prompt, generate_response_prompt
+from utils.chatbot import CompanySearchEngine
+from utils.aggregates import AggregateEngine
+from utils.chat_turn import AssistantServices, TurnUI, handle_turn
+from utils.conversation import ConversationMemory
+from utils.llm_client import AssistantClient
+from utils.model_router import ModelRouter, RouterConfig
+from utils.response_cache import ResponseCache
+from utils.telemetry import MetricsLog, trace
+from utils.warmup import SUGGESTED_QUERIES, seed_queries, warm_responses, warm_search
 
 # Page config
 st.set_page_config(
@@ -504,13 +515,135 @@ with tab3:
     # Initialize search engine
     @st.cache_resource
     def get_search_engine():
-        return CompanySearchEngine(raw_data)
+        # Set SEARCH_INDEX_DIR to share one memory-mapped TF-IDF matrix across worker processes
+        engine = CompanySearchEngine(raw_data, index_dir=os.environ.get("SEARCH_INDEX_DIR"))
+        # Retrieval for the suggested questions (ASSISTANT_WARMUP_QUERIES) is cached before the first visitor asks
+        warm_search(engine, seed_queries(), candidates=df.index.to_numpy())
+        return engine
 
     search_engine = get_search_engine()
+    aggregate_engine = AggregateEngine(search_engine)
 
-    # Initialize chat history
+    @st.cache_resource
+    def get_response_cache():
+        # Answers are shared by all sessions; RESPONSE_CACHE_PATH overrides the SQLite file location
+        default_path = Path(__file__).parent / ".cache" / "assistant_responses.sqlite"
+        return ResponseCache(os.environ.get("RESPONSE_CACHE_PATH", default_path))
+
+    response_cache = get_response_cache()
+
+    @st.cache_resource
+    def get_model_router():
+        # Per-route latency lines go to the server log
+        logging.basicConfig()
+        logging.getLogger("utils.model_router").setLevel(logging.INFO)
+        return ModelRouter(RouterConfig.from_env())
+
+    model_router = get_model_router()
+
+    @st.cache_resource
+    def get_metrics_log():
+        # One JSON line of spans and token counts per turn; summarize with `python -m utils.telemetry`
+        return MetricsLog(os.environ.get("ASSISTANT_METRICS_PATH"))
+
+    metrics_log = get_metrics_log()
+
+    @st.cache_resource
+    def get_llm_client(api_key):
+        # One pooled client, concurrency limit and rate limit for all sessions in this process;
+        # waiting calls are served round-robin per session
+        requests_per_minute = os.environ.get("ASSISTANT_REQUESTS_PER_MINUTE")
+        burst = os.environ.get("ASSISTANT_REQUEST_BURST")
+        return AssistantClient(
+            api_key,
+            max_concurrent=int(os.environ.get("ASSISTANT_MAX_CONCURRENT", 4)),
+            requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+            burst=float(burst) if burst else None,
+        )
+
+    def render_company_cards(results, limit=4):
+        # Top matches straight from the index, shown while the model answer is on its way
+        top = results[:limit]
+        for col, result in zip(st.columns(len(top)), top):
+            company = result['company']
+            wp = company.get('work_policy', {})
+            days = wp.get('days_required')
+            with col:
+                st.markdown(f"**{company.get('company', 'Unknown')}**")
+                st.caption(f"{wp.get('type', 'Unknown')}" + (f" · {days} days" if days not in (None, '') else ''))
+                st.caption(company.get('sector', ''))
+
+    class StreamlitTurnUI(TurnUI):
+        # Renders each stage of a chat turn inside the assistant's chat message
+
+        def show_message(self, text, caption=None):
+            st.markdown(text)
+            if caption:
+                st.caption(caption)
+
+        def show_cards(self, results):
+            render_company_cards(results)
+
+        def wait_in_queue(self, ticket):
+            # Queued behind other calls: show the position until admitted (or timed out)
+            queue_status = st.empty()
+            while ticket.pending:
+                queue_status.caption(
+                    f"Waiting for the assistant · position {max(ticket.position(), 1)} in queue · "
+                    f"about {ticket.estimated_wait():.0f}s"
+                )
+                ticket.wait_decided(0.5)
+            queue_status.empty()
+
+        def stream_answer(self, chunks):
+            # Streaming response below the cards
+            return st.write_stream(chunks)
+
+        def show_cache_hit(self, cached, stats):
+            st.caption(
+                f"Cached answer · saved {cached.latency:.1f}s · "
+                f"cache hit rate {stats['hit_rate']:.0%}, {stats['saved_seconds']:.0f}s saved in total"
+            )
+
+        def show_error(self, text, warning=False):
+            if warning:
+                st.warning(text)
+            else:
+                st.error(text)
+
+    @st.cache_resource
+    def start_answer_warmup(api_key):
+        # Once per process, answer the suggested questions in the background. Questions already
+        # in the response cache are skipped, so this only calls the model after a data or prompt change.
+        thread = threading.Thread(
+            target=warm_responses,
+            args=(search_engine, response_cache, get_llm_client(api_key), model_router, seed_queries()),
+            kwargs={'candidates': df.index.to_numpy()},
+            name='answer-warmup',
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    try:
+        api_key = st.secrets.get("ANTHROPIC_API_KEY", None)
+    except FileNotFoundError:
+        api_key = None
+    if api_key:
+        start_answer_warmup(api_key)
+
+    # Displayed messages per session; older ones are dropped so a long session can't grow without bound
+    MAX_DISPLAYED_MESSAGES = 40
+
+    # Initialize chat history and the bounded memory sent to the model
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory()
+    if "session_id" not in st.session_state:
+        # Fair-queue key for this browser session's model calls
+        st.session_state.session_id = uuid.uuid4().hex
+    memory = st.session_state.memory
 
     # Header with restart button (always show)
     col_header, col_clear = st.columns([4, 1])
@@ -520,6 +653,7 @@ with tab3:
         if st.session_state.messages:
             if st.button("Restart", icon=":material/refresh:"):
                 st.session_state.messages = []
+                memory.clear()
                 st.rerun()
 
     # Chat input FIRST (renders at bottom)
@@ -528,7 +662,7 @@ with tab3:
     # Show intro text only when empty
     if not st.session_state.messages and not user_message:
         st.markdown("Ask questions about work policies across America's top innovators.")
-        st.caption("Try: *Which tech companies are fully remote?* • *Compare Google and Microsoft* • *Who's tightening RTO?*")
+        st.caption("Try: " + " • ".join(f"*{query}*" for query in SUGGESTED_QUERIES))
 
     # Display chat history
     for message in st.session_state.messages:
@@ -541,51 +675,21 @@ with tab3:
         with st.chat_message("user"):
             st.markdown(user_message)
 
-        # Search for relevant companies
-        search_results = search_engine.search(user_message, top_k=5)
-
-        # Generate and display assistant response
-        with st.chat_message("assistant"):
-            if search_results:
-                context = format_company_context(search_results)
-
-                try:
-                    api_key = st.secrets.get("ANTHROPIC_API_KEY", None)
-
-                    if api_key:
-                        client = anthropic.Anthropic(api_key=api_key)
-
-                        # Streaming response
-                        with client.messages.stream(
-                            model="claude-sonnet-4-20250514",
-                            max_tokens=1024,
-                            system=create_system_prompt(),
-                            messages=[
-                                {"role": "user", "content": generate_response_prompt(user_message, context)}
-                            ]
-                        ) as stream:
-                            assistant_message = st.write_stream(stream.text_stream)
-                    else:
-                        # Fallback without API key
-                        companies_found = [r['company'].get('company', 'Unknown') for r in search_results]
-                        assistant_message = f"**Found {len(search_results)} companies:** {', '.join(companies_found)}\n\n"
-                        for result in search_results[:3]:
-                            company = result['company']
-                            wp = company.get('work_policy', {})
-                            assistant_message += f"**{company.get('company', 'Unknown')}** - {wp.get('type', 'Unknown')} ({wp.get('days_required', 'N/A')} days)\n\n"
-                        assistant_message += "\n*Add Anthropic API key for AI-generated insights.*"
-                        st.markdown(assistant_message)
-
-                except Exception as e:
-                    assistant_message = f"Error: {str(e)}"
-                    st.error(assistant_message)
-            else:
-                assistant_message = "I couldn't find matching companies. Try asking about specific companies, sectors, or policy types."
-                st.markdown(assistant_message)
-
-        # Add to history AFTER displaying
-        st.session_state.messages.append({"role": "user", "content": user_message})
-        st.session_state.messages.append({"role": "assistant", "content": assistant_message})
+        # Time every stage of the turn into the metrics log
+        with trace('assistant_turn', log=metrics_log):
+            services = AssistantServices(search_engine, aggregate_engine, model_router, response_cache,
+                                         get_llm_client(api_key) if api_key else None)
+
+            # Generate and display assistant response (utils/chat_turn.py, shared with the load test)
+            with st.chat_message("assistant"):
+                # Restrict to the sidebar selection (filtered_df keeps the row positions of raw_data as its index)
+                outcome = handle_turn(services, memory, user_message, StreamlitTurnUI(),
+                                      session=st.session_state.session_id, candidates=filtered_df.index.to_numpy())
+
+            # Add to history AFTER displaying
+            st.session_state.messages.append({"role": "user", "content": user_message})
+            st.session_state.messages.append({"role": "assistant", "content": outcome.answer})
+            del st.session_state.messages[:-MAX_DISPLAYED_MESSAGES]
 
 # Tab 4: Analytics
 with tab4:
@@ -0,0 +1,236 @@
+"""
+Deterministic answers for aggregate questions.
+
+Questions such as "how many companies are fully remote", "average days
+in office for healthcare" or "which companies are tightening" are
+counts, averages and lists over structured columns. They are answered
+here from the search engine's column indexes, over every matching
+company rather than a top-k sample, and without an LLM call. Anything
+open-ended (why, compare, quotes, named companies) is left to the LLM.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from utils.chatbot import CompanySearchEngine
+from utils.phrase_index import quoted_phrases
+
+_COUNT_PATTERN = re.compile(
+    r'\bhow many\b|\bnumber of\b|\bcount\b|\bwhat (?:percentage|percent|share|fraction|proportion)\b'
+)
+_AVERAGE_PATTERN = re.compile(r'\b(?:average|avg|mean|typical)\b')
+_LIST_PATTERN = re.compile(
+    r'^\s*(?:which|what|list|show|name)\b.*\b(?:companies|company|firms|employers|ones|organizations)\b'
+    r'|^\s*who(?:\'s|s| is| are)\b'
+)
+_OPEN_ENDED_PATTERN = re.compile(
+    r'\b(?:why|explain|compare|comparison|versus|vs|quote|quotes|said|say|says|think|reason|reasons'
+    r'|impact|affect|effect|describe|tell me about|differ|difference|should|opinion|feel|feels)\b'
+)
+# Words an aggregate question can contain besides its filters. Anything else ("badge",
+# "stipends", "most", "strictest") asks for more than a count or list of the filtered
+# companies, so the question goes to retrieval and the LLM.
+_AGGREGATE_WORDS = {
+    # Question words
+    'which', 'what', 'who', 'whats', 's', 'how', 'many', 'much', 'number', 'count', 'percentage', 'percent',
+    'share', 'fraction', 'proportion', 'average', 'avg', 'mean', 'typical', 'list', 'show', 'name', 'me', 'all',
+    'is', 'are', 'was', 'were', 'do', 'does', 'have', 'has', 'there', 'any', 'currently', 'now', 'still',
+    'the', 'a', 'an', 'of', 'in', 'on', 'at', 'for', 'with', 'to', 'from', 'and', 'or', 'their', 'that', 'those',
+    'by', 'per', 'each', 'across', 'every',
+    # What the filters describe
+    'companies', 'company', 'firms', 'employers', 'ones', 'organizations', 'sector', 'sectors', 'industry',
+    'industries', 'category', 'categories', 'trend', 'trends', 'state', 'states', 'based', 'headquartered',
+    'located', 'days', 'day', 'week', 'office', 'policy', 'policies', 'rto', 'return', 'work', 'working',
+    'require', 'requires', 'required', 'requirement', 'requirements', 'mandate', 'mandates', 'mandatory',
+    'make', 'makes', 'made', 'it',
+}
+
+_GROUP_PATTERN = re.compile(r'\b(?:by|per|each|across|for every)\s+(sector|industry|category|categor|trend|state)')
+
+# Group-by words -> column
+GROUP_COLUMNS = {'sector': 'sector', 'industry': 'sector', 'category': 'category', 'categor': 'category',
+                 'trend': 'trend', 'state': 'state'}
+
+COLUMN_LABELS = {'days': 'days in office', 'category': 'policy category', 'trend': 'trend',
+                 'sector': 'sector', 'state': 'state'}
+
+# Columns that define which companies a question is about ("tech companies", "in Texas");
+# the others are the attributes being counted, so shares are taken within that population
+POPULATION_COLUMNS = ('sector', 'state')
+
+
+@dataclass
+class AggregateAnswer:
+    intent: str      # 'count', 'average' or 'list'
+    text: str        # Markdown answer
+    rows: List[int]  # Dataset rows the answer covers
+
+
+def classify_query(query: str) -> Optional[str]:
+    """Return 'count', 'average' or 'list' for aggregate questions, None for open-ended ones."""
+    text = query.lower()
+    if _OPEN_ENDED_PATTERN.search(text) or quoted_phrases(query):
+        return None
+    # Before counts: "average number of days" asks for an average
+    if _AVERAGE_PATTERN.search(text) and re.search(r'\bdays?\b', text):
+        return 'average'
+    if _COUNT_PATTERN.search(text):
+        return 'count'
+    if _LIST_PATTERN.search(text):
+        return 'list'
+    return None
+
+
+def _days(company: Dict[str, Any]) -> Optional[int]:
+    """Required days, or None when there is no fixed requirement (hybrid listed with 0 days)."""
+    wp = company.get('work_policy', {})
+    try:
+        days = int(wp.get('days_required', 0) or 0)
+    except (ValueError, TypeError):
+        return None
+    if days == 0 and wp.get('category') != 'Fully Remote':
+        return None
+    return days
+
+
+def _describe_filters(filters: Dict[str, set]) -> str:
+    parts = []
+    for column, values in filters.items():
+        if column == 'days':
+            days = [str(d) for d in sorted(values)]
+            shown = days[0] if len(days) == 1 else f"{', '.join(days[:-1])} or {days[-1]}"
+            parts.append(f"{shown} days in office")
+        else:
+            parts.append(f"{COLUMN_LABELS[column]} {' or '.join(sorted(values))}")
+    return ', '.join(parts)
+
+
+class AggregateEngine:
+    """Counts, averages and lists over the structured columns of a CompanySearchEngine."""
+
+    def __init__(self, engine: CompanySearchEngine):
+        self.engine = engine
+
+    def _group_values(self, column: str) -> Dict[int, str]:
+        """Row -> value of a column, from the engine's column indexes."""
+        return {int(row): value for value, rows in self.engine.column_indexes[column].items() for row in rows}
+
+    def answer(self, query: str,
+               candidates: Union[np.ndarray, Iterable, None] = None) -> Optional[AggregateAnswer]:
+        """
+        Answer an aggregate question over the candidate companies (default: all).
+
+        Returns None when the question is open-ended or names specific
+        companies, so the caller falls back to retrieval and the LLM.
+        """
+        intent = classify_query(query)
+        if intent is None or self.engine.entity_matcher.find(query):
+            return None
+
+        original_words = re.findall(r'\w+', query.lower())
+        # Filters come from the question as typed; the corrected spelling only helps the word check
+        matched_terms = set()
+        filters = self.engine.parse_query(query, matched_terms=matched_terms)
+        query = self.engine.correct_query(query)
+        # Listing every company is not an aggregate answer
+        if intent == 'list' and not filters:
+            return None
+
+        # The filters must account for the whole question, in either the typed or corrected spelling.
+        # Numbers count only when a day constraint read them ("3 or 4 days", not a stray "3").
+        words = re.findall(r'\w+', query.lower())
+        if len(words) != len(original_words):
+            original_words = words
+        accounted = matched_terms | _AGGREGATE_WORDS
+        if any(word not in accounted and original not in accounted
+               for word, original in zip(words, original_words)):
+            return None
+
+        scope = self.engine.candidate_rows(candidates)
+        if scope is None:
+            scope = np.arange(len(self.engine.companies))
+        scope_label = (f"all {len(scope)} companies" if len(scope) == len(self.engine.companies)
+                       else f"the {len(scope)} companies in the current selection")
+
+        # Shares are relative to the population the question is about
+        population_filters = {c: v for c, v in filters.items() if c in POPULATION_COLUMNS}
+        if population_filters and len(population_filters) < len(filters):
+            scope = np.intersect1d(scope, self.engine.resolve_filters(population_filters))
+            scope_label = f"the {len(scope)} companies with {_describe_filters(population_filters)}"
+            filters = {c: v for c, v in filters.items() if c not in POPULATION_COLUMNS}
+
+        rows = self.engine.resolve_filters(filters)
+        rows = scope if rows is None else np.intersect1d(scope, rows)
+        rows = [int(r) for r in rows]
+
+        group = _GROUP_PATTERN.search(query.lower())
+        group_column = GROUP_COLUMNS[group.group(1)] if group else None
+        condition = _describe_filters(filters)
+
+        if intent == 'count':
+            text = self._count(rows, len(scope), condition, scope_label, group_column)
+        elif intent == 'average':
+            text = self._average(rows, condition, scope_label, group_column)
+        else:
+            text = self._list(rows, condition, scope_label)
+        return AggregateAnswer(intent=intent, text=text, rows=rows)
+
+    def _count(self, rows: List[int], total: int, condition: str, scope_label: str,
+               group_column: Optional[str]) -> str:
+        if condition:
+            share = len(rows) / total if total else 0.0
+            lines = [f"**{len(rows)}** of {scope_label} ({share:.0%}) have {condition}."]
+        else:
+            lines = [f"Companies counted: **{len(rows)}** ({scope_label})."]
+        if group_column:
+            values = self._group_values(group_column)
+            counts = Counter(values.get(row, 'Unknown') for row in rows)
+            lines.append('')
+            lines.extend(f"- {value}: {n}" for value, n in counts.most_common())
+        elif condition and 0 < len(rows) <= 15:
+            names = [self.engine.companies[row].get('company', 'Unknown') for row in rows]
+            lines.append('')
+            lines.append(', '.join(names))
+        return '\n'.join(lines)
+
+    def _average(self, rows: List[int], condition: str, scope_label: str,
+                 group_column: Optional[str]) -> str:
+        among = f"companies with {condition} ({len(rows)} of {scope_label})" if condition else scope_label
+        days = {row: _days(self.engine.companies[row]) for row in rows}
+        fixed = [d for d in days.values() if d is not None]
+        if not fixed:
+            return f"None of {among} have a fixed number of office days."
+
+        lines = [f"Average days in office across {among}: **{sum(fixed) / len(fixed):.1f}** "
+                 f"({len(fixed)} companies with a fixed requirement)."]
+        if len(fixed) < len(rows):
+            lines.append(f"{len(rows) - len(fixed)} hybrid companies without a fixed day count are not included.")
+        if group_column:
+            values = self._group_values(group_column)
+            groups = {}
+            for row, d in days.items():
+                if d is not None:
+                    groups.setdefault(values.get(row, 'Unknown'), []).append(d)
+            lines.append('')
+            for value, group_days in sorted(groups.items(), key=lambda item: (-len(item[1]), item[0])):
+                lines.append(f"- {value}: {sum(group_days) / len(group_days):.1f} days (n={len(group_days)})")
+        return '\n'.join(lines)
+
+    def _list(self, rows: List[int], condition: str, scope_label: str) -> str:
+        if not rows:
+            return f"None of {scope_label} have {condition}."
+        lines = [f"**{len(rows)}** of {scope_label} have {condition}:", '']
+        for row in rows:
+            company = self.engine.companies[row]
+            wp = company.get('work_policy', {})
+            details = [wp.get('category', 'Unknown')]
+            days = _days(company)
+            if days is not None:
+                details.append(f"{days} days")
+            details.append(wp.get('trend_direction', 'Unknown'))
+            lines.append(f"- **{company.get('company', 'Unknown')}**: {', '.join(details)}")
+        return '\n'.join(lines)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Batch-file ingestion benchmarks for merge_research_data.
+
+Writes thousands of synthetic research batch files, modelled on the
+cleanup results and alternating between the old (list) and new
+(companies object) formats with overlapping company names, then merges
+them serially and with a process pool. Checks that both give the same
+records, and shows how much of the serial time is spent decoding and
+normalizing (the part the pool spreads over CPUs). The incremental
+benchmark re-runs the merge with a manifest after adding or editing
+one batch. The category benchmark checks map_to_category's single-pass
+keyword scan against the original chain of keyword checks, on the
+arguments the real merge passes and on synthetic keyword-dense text.
+
+Run from the repository root:
+    python -m utils.benchmark_merge [n_files]
+"""
+
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from utils import merge_data
+from utils.merge_data import CATEGORY_KEYWORDS, ingest_batch_file, load_json_file, map_to_category, merge_research_data
+
+CLEANUP_RESULTS = Path(__file__).parent.parent / "cleanup_results"
+
+
+def _new_format(record: dict) -> dict:
+    wp = record['work_policy']
+    return {
+        'company_name': record['company'],
+        'rank': record['rank'],
+        'sector': record.get('sector', 'Unknown'),
+        'current_policy': wp.get('type', ''),
+        'policy_details': {
+            'model_type': wp.get('type'),
+            'office_requirements': str(wp.get('details', ''))[:80],
+            'flexibility': wp.get('specific_days', ''),
+            'typical_schedule': wp.get('specific_days', 'N/A'),
+            'enforcement_date': wp.get('effective_date', 'N/A'),
+        },
+        'trend_direction': wp.get('trend_direction', 'Unknown'),
+        'confidence_level': 'High',
+        'key_findings': record.get('key_quote', ''),
+        'sources': record.get('sources', []),
+    }
+
+
+def _map_to_category_reference(policy_type: str, days_required: int, details: str) -> str:
+    """
+    map_to_category as it was before the single-pass keyword scan, kept to check against.
+
+    Categories:
+    - Fully Remote: Truly remote-first companies (explicit remote-first/permanent remote)
+    - Hybrid: 1-4 days in office, flexible, role-dependent, or unclear
+    - Full Office: 5 days required in office
+    """
+    policy_lower = policy_type.lower() if policy_type else ""
+    details_lower = details.lower() if details else ""
+    combined = policy_lower + " " + details_lower
+
+    # Full Office (5 days)
+    if days_required >= 5:
+        return "Full Office"
+
+    if any(keyword in policy_lower for keyword in ['5-day office', 'full-time office', 'five days']):
+        return "Full Office"
+
+    # Categorize as Hybrid first for ambiguous cases
+    # This prevents false positives in "Fully Remote"
+
+    # Unknown/unclear policies → Hybrid
+    if any(keyword in policy_lower for keyword in ['unknown', 'unclear', 'unable to verify', 'no public data']):
+        return "Hybrid"
+
+    # Role/position/client dependent → Hybrid (varies by person)
+    if any(keyword in combined for keyword in ['role-dependent', 'role dependent', 'position-dependent', 'position dependent',
+                                                 'varies by role', 'varies by position', 'client-dependent', 'client dependent']):
+        return "Hybrid"
+
+    # Limited/partial remote → Hybrid
+    if any(keyword in policy_lower for keyword in ['limited remote', 'partial remote', 'some remote']):
+        return "Hybrid"
+
+    # Flexible/hybrid keywords → Hybrid
+    if any(keyword in policy_lower for keyword in ['flexible', 'hybrid', 'days in office', 'days per week']):
+        return "Hybrid"
+
+    # Healthcare clinical/administrative split → Hybrid
+    if 'clinical' in details_lower and 'administrative' in details_lower:
+        return "Hybrid"
+
+    # Now check for TRUE Fully Remote (must have explicit indicators)
+    # Only categorize as Fully Remote if we have strong evidence
+    if any(keyword in policy_lower for keyword in ['remote-first', 'fully remote', 'fully-remote', 'permanent remote',
+                                                     'permanently remote', 'remote only', 'all-remote', 'distributed',
+                                                     'work from anywhere', 'location independent']):
+        return "Fully Remote"
+
+    # 1-4 days in office → Hybrid
+    if days_required in [1, 2, 3, 4]:
+        return "Hybrid"
+
+    # Default: If we don't have clear indicators, assume Hybrid
+    # This is safer than assuming Fully Remote
+    return "Hybrid"
+
+
+def write_synthetic_batches(target: Path, n_files: int, companies_per_file: int = 5, n_companies: int = 2000,
+                            seed: int = 0):
+    """Research batch files under target/research_results, built from the cleanup records."""
+    rng = random.Random(seed)
+    with redirect_stdout(io.StringIO()):
+        templates = [record for path in sorted(CLEANUP_RESULTS.glob("cleanup_batch_*_results.json"))
+                     for record in load_json_file(path)[0] if isinstance(record.get('work_policy'), dict)]
+    out_dir = target / "research_results"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(n_files):
+        records = []
+        for _ in range(companies_per_file):
+            record = json.loads(json.dumps(rng.choice(templates)))
+            record['company'] = f"Company {rng.randrange(n_companies)}"
+            record['rank'] = rng.randrange(1, 500)
+            records.append(record)
+        if i % 2:
+            data = {'batch_number': i, 'research_date': '2025-11-17', 'companies': [_new_format(r) for r in records]}
+        else:
+            data = records
+        (out_dir / f"batch_{i:05d}_results.json").write_text(json.dumps(data, indent=2), encoding='utf-8')
+
+
+def benchmark_merge(n_files: int = 4000):
+    workers = os.cpu_count() or 1
+    print(f"Batch ingestion: {n_files} synthetic batch files, {workers} CPU(s)")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_synthetic_batches(Path(tmp), n_files)
+        files = sorted((Path(tmp) / "research_results").glob("batch_*_results.json"))
+
+        start = time.perf_counter()
+        for path in files:
+            ingest_batch_file(path)
+        ingest_seconds = time.perf_counter() - start
+
+        timings = {}
+        results = {}
+        for label, n_workers in (("serial", 1), (f"pool ({max(workers, 2)} workers)", max(workers, 2))):
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                results[label] = merge_research_data(tmp, workers=n_workers)
+            timings[label] = time.perf_counter() - start
+
+    serial = timings["serial"]
+    print(f"Decode + normalize alone: {ingest_seconds:.2f}s ({ingest_seconds / serial:.0%} of the serial merge)")
+    for label, seconds in timings.items():
+        print(f"{label:<24}{seconds:>8.2f}s{serial / seconds:>8.2f}x")
+    first, second = results.values()
+    print(f"Identical output: {first == second} ({len(first)} companies)")
+    print()
+
+
+def benchmark_incremental(n_files: int = 4000):
+    """Merge with a manifest: first run, no change, one batch added, one batch edited."""
+    print(f"Incremental merge: {n_files} synthetic batch files with a manifest")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_synthetic_batches(Path(tmp), n_files)
+        manifest = Path(tmp) / "merged.manifest.sqlite"
+        research = Path(tmp) / "research_results"
+
+        def timed_merge(label, **kwargs):
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                merged = merge_research_data(tmp, workers=1, **kwargs)
+            print(f"{label:<32}{time.perf_counter() - start:>8.2f}s")
+            return merged
+
+        timed_merge("first run (builds manifest)", manifest_path=manifest)
+        timed_merge("no changes", manifest_path=manifest)
+
+        # One more batch, sorting last like a new cleanup result
+        extra = json.loads((research / "batch_00000_results.json").read_text(encoding='utf-8'))
+        for record in extra:
+            record['work_policy']['days_required'] = 5
+        (research / f"batch_{n_files:05d}_results.json").write_text(json.dumps(extra), encoding='utf-8')
+        timed_merge("one batch added", manifest_path=manifest)
+
+        edited = research / "batch_00002_results.json"
+        edited.write_text(edited.read_text(encoding='utf-8').replace('Hybrid', 'Hybrid (edited)'), encoding='utf-8')
+        incremental = timed_merge("one batch edited", manifest_path=manifest)
+        full = timed_merge("full merge without manifest")
+        print(f"Identical output: {incremental == full}; manifest {manifest.stat().st_size / 1e6:.1f} MB")
+    print()
+
+
+def _recorded_category_calls():
+    """The map_to_category arguments of a merge of the repository's own batch files."""
+    calls = []
+
+    def record(*args):
+        calls.append(args)
+        return _map_to_category_reference(*args)
+
+    original, merge_data.map_to_category = merge_data.map_to_category, record
+    try:
+        with redirect_stdout(io.StringIO()):
+            merge_research_data(str(CLEANUP_RESULTS.parent), workers=1)
+    finally:
+        merge_data.map_to_category = original
+    return calls
+
+
+def _synthetic_category_calls(n: int, seed: int = 0):
+    """Texts built from keywords, their fragments and case variants, including keywords split across the join."""
+    rng = random.Random(seed)
+    keywords = [keyword for _, _, group in CATEGORY_KEYWORDS for keyword in group]
+    pieces = keywords + [keyword[:rng.randrange(1, len(keyword))] for keyword in keywords] + [
+        keyword[rng.randrange(1, len(keyword)):] for keyword in keywords] + [
+        'office', 'remote', 'work', 'policy', 'days', '3 days', 'employees', ' ', '-', ',', 'permanently', 'role']
+
+    def text():
+        words = rng.choices(pieces, k=rng.randrange(0, 8))
+        joined = rng.choice(['', ' ', '-']).join(words)
+        return joined.upper() if rng.random() < 0.1 else joined
+
+    calls = []
+    for _ in range(n):
+        policy, details = text(), text()
+        if rng.random() < 0.2:
+            # A keyword split between the policy and the details
+            keyword = rng.choice(keywords)
+            cut = rng.randrange(1, len(keyword))
+            policy, details = policy + keyword[:cut], keyword[cut + 1:] + details if keyword[cut] == ' ' else keyword[cut:] + details
+        calls.append((rng.choice([policy, policy, None, '']), rng.choice([0, 0, 0, 1, 3, 4, 5, 6]),
+                      rng.choice([details, details, None, ''])))
+    return calls
+
+
+def benchmark_categories(n_synthetic: int = 200000):
+    """map_to_category against the original keyword chain: same categories, and time per call."""
+    print(f"Category mapping: real merge arguments and {n_synthetic} synthetic cases")
+    print("=" * 60)
+    for label, calls in (("real", _recorded_category_calls()), ("synthetic", _synthetic_category_calls(n_synthetic))):
+        mismatches = [args for args in calls if map_to_category(*args) != _map_to_category_reference(*args)]
+        timings = {}
+        for name, function in (("keyword chain", _map_to_category_reference), ("single pass", map_to_category)):
+            start = time.perf_counter()
+            for args in calls:
+                function(*args)
+            timings[name] = (time.perf_counter() - start) / len(calls) * 1e6
+        print(f"{label:<10}{len(calls):>8} calls  mismatches {len(mismatches)}  "
+              + "  ".join(f"{name} {us:.2f}us" for name, us in timings.items()))
+        for args in mismatches[:5]:
+            print(f"  {args!r}: {map_to_category(*args)} vs {_map_to_category_reference(*args)}")
+    print()
+
+
+if __name__ == "__main__":
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    benchmark_merge(n_files)
+    benchmark_incremental(n_files)
+    benchmark_categories()
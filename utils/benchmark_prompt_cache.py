@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Request structure and token accounting for the prompt-cached system prefix.
+
+Runs chat turns through handle_turn() against a stub messages client that
+records every request and bills it like the provider: the system prefix
+up to the cache_control marker is written to the cache on its first use
+and read from it afterwards, but only when it reaches the model's minimum
+cacheable length (PROMPT_CACHE_MIN_TOKENS). Checks that the system blocks
+are identical across questions and sessions, that only the last block is
+marked, that only the user message varies, and that AssistantClient's
+token counters add up to what the stub billed. It runs once with the
+provider's minimums and once as if the prefix were long enough.
+
+Run from the repository root:
+    python -m utils.benchmark_prompt_cache
+"""
+
+import json
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from utils.aggregates import AggregateEngine
+from utils.benchmark_search import load_companies
+from utils.chat_turn import AssistantServices, handle_turn
+from utils.chatbot import CompanySearchEngine, estimate_tokens, prompt_cache_min_tokens
+from utils.conversation import ConversationMemory
+from utils.llm_client import AssistantClient
+from utils.model_router import ModelRouter
+
+QUESTIONS = [
+    "What is Apple's policy?",
+    "Compare Google and Microsoft",
+    "What do executives say about collaboration and innovation?",
+    "What is Nvidia's approach to remote work?",
+]
+
+
+class _StubStream:
+    def __init__(self, usage: Dict[str, int]):
+        self.text_stream = iter(["Stub ", "answer."])
+        self._usage = usage
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(**self._usage))
+
+
+class StubMessages:
+    """messages.stream() stand-in that records requests and bills prompt caching like the provider."""
+
+    def __init__(self, min_tokens: Optional[int] = None):
+        """
+        Args:
+            min_tokens: Minimum cacheable prefix for every model (default: the provider's per model)
+        """
+        self.min_tokens = min_tokens
+        self.requests: List[Dict[str, Any]] = []
+        self.billed = Counter()
+        self._cached = set()
+
+    def stream(self, **request):
+        self.requests.append(request)
+        system = request['system']
+        marked = max(i for i, block in enumerate(system) if 'cache_control' in block)
+        prefix_tokens = sum(estimate_tokens(block['text']) for block in system[:marked + 1])
+        other_tokens = (sum(estimate_tokens(block['text']) for block in system[marked + 1:])
+                        + sum(estimate_tokens(m['content']) for m in request['messages']))
+
+        usage = {'input_tokens': other_tokens, 'output_tokens': 2,
+                 'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        minimum = self.min_tokens if self.min_tokens is not None else prompt_cache_min_tokens(request['model'])
+        key = (request['model'], json.dumps(system[:marked + 1]))
+        if prefix_tokens < minimum:
+            usage['input_tokens'] += prefix_tokens
+        elif key in self._cached:
+            usage['cache_read_input_tokens'] = prefix_tokens
+        else:
+            usage['cache_creation_input_tokens'] = prefix_tokens
+            self._cached.add(key)
+        self.billed.update(usage)
+        return _StubStream(usage)
+
+
+def run_turns(engine: CompanySearchEngine, min_tokens: Optional[int] = None):
+    """Two sessions asking QUESTIONS; returns (stub, client)."""
+    client = AssistantClient('stub')
+    stub = StubMessages(min_tokens)
+    client.client = SimpleNamespace(messages=stub)
+    # No response cache, so every turn reaches the model
+    services = AssistantServices(engine, AggregateEngine(engine), ModelRouter(), client=client)
+    for session in ('a', 'b'):
+        memory = ConversationMemory()
+        for question in QUESTIONS:
+            outcome = handle_turn(services, memory, question, session=session)
+            assert not outcome.failed, outcome.answer
+    return stub, client
+
+
+def benchmark_prompt_cache():
+    engine = CompanySearchEngine(load_companies())
+    print("Prompt-cached system prefix")
+    print("=" * 60)
+
+    for label, min_tokens in (("provider minimums", None), ("prefix long enough", 0)):
+        stub, client = run_turns(engine, min_tokens)
+        requests = stub.requests
+        systems = {json.dumps(r['system']) for r in requests}
+        system = requests[0]['system']
+        marked = [i for i, block in enumerate(system) if 'cache_control' in block]
+        user_messages = [r['messages'][-1]['content'] for r in requests]
+        stats = client.stats()
+        counted = {name: stats[name] for name in stub.billed}
+
+        prefix = sum(estimate_tokens(block['text']) for block in system)
+        minimums = {model: prompt_cache_min_tokens(model) for model in sorted({r['model'] for r in requests})}
+        print(f"{label}: {len(requests)} model calls over 2 sessions")
+        print(f"  System prefix: {prefix} estimated tokens; minimum "
+              + ", ".join(f"{model} {minimum}" for model, minimum in minimums.items()))
+        print(f"  Identical system blocks: {len(systems) == 1}")
+        print(f"  Only the last block marked: {marked == [len(system) - 1]}")
+        print(f"  One distinct user message per question: {len(set(user_messages)) == len(QUESTIONS)}")
+        print(f"  Billed: {dict(stub.billed)}")
+        print(f"  Counters match: {counted == dict(stub.billed)}; cache read share {stats['cache_read_ratio']:.0%}")
+    print()
+
+
+if __name__ == "__main__":
+    benchmark_prompt_cache()
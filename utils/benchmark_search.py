@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Research Assistant search engine.
+
+Run from the repository root:
+    python -m utils.benchmark_search [n_docs]
+"""
+
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from utils.chatbot import CompanySearchEngine, estimate_tokens, format_company_context
+from utils.spelling import SymSpellIndex
+from utils.vector_index import HashedNgramEmbedder, IVFIndex
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "forbes500_rto_data_top100_enriched.json"
+
+
+def load_companies() -> list:
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def synthetic_documents(n_docs: int, seed: int = 0) -> List[str]:
+    """
+    Generate documents that look like noisy variants of the real ones.
+
+    Each document keeps a random half of a real company document's words
+    and mixes in words from elsewhere in the corpus, so the collection has
+    the topical clusters real data has instead of uniform word soup.
+    """
+    engine = CompanySearchEngine(load_companies())
+    base_docs = [doc.split() for doc in engine.documents]
+    words = [w for doc in base_docs for w in doc]
+    rng = np.random.default_rng(seed)
+
+    docs = []
+    for base in rng.integers(0, len(base_docs), size=n_docs):
+        kept = [w for w in base_docs[base] if rng.random() < 0.5]
+        noise = rng.integers(0, len(words), size=rng.integers(5, 30))
+        docs.append(' '.join(kept + [words[i] for i in noise]))
+    return docs
+
+
+def percentile_ms(samples: List[float], pct: float) -> float:
+    return float(np.percentile(samples, pct)) * 1000
+
+
+def benchmark_ann(n_docs: int = 100_000, n_queries: int = 200, k: int = 5):
+    """Recall@k and latency of IVF search against brute force on synthetic documents."""
+    print(f"Dense ANN benchmark: {n_docs:,} documents, {n_queries} queries, k={k}")
+    print("=" * 60)
+
+    docs = synthetic_documents(n_docs)
+    start = time.perf_counter()
+    embedder = HashedNgramEmbedder().fit(docs)
+    vectors = embedder.embed_many(docs)
+    print(f"Embedding: {time.perf_counter() - start:.1f}s ({vectors.nbytes / 1e6:.0f} MB float32)")
+
+    start = time.perf_counter()
+    index = IVFIndex().build(vectors)
+    print(f"IVF build: {time.perf_counter() - start:.1f}s ({len(index.list_ids)} lists)\n")
+
+    # Queries: a few words from random documents, so neighbours are not trivial
+    rng = np.random.default_rng(1)
+    queries = []
+    for i in rng.choice(n_docs, size=n_queries, replace=False):
+        words = docs[i].split()
+        queries.append(embedder.embed(' '.join(rng.choice(words, size=min(8, len(words)), replace=False))))
+
+    truth = []
+    brute_times = []
+    for q in queries:
+        start = time.perf_counter()
+        scores = vectors @ q
+        top = np.argpartition(-scores, k - 1)[:k]
+        brute_times.append(time.perf_counter() - start)
+        truth.append(set(top.tolist()))
+
+    print(f"{'method':<16}{'recall@' + str(k):>10}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'brute force':<16}{1.0:>10.3f}{percentile_ms(brute_times, 50):>10.2f}{percentile_ms(brute_times, 95):>10.2f}")
+
+    for n_probe in (4, 8, 16, 32):
+        hits = 0
+        times = []
+        for q, expected in zip(queries, truth):
+            start = time.perf_counter()
+            ids, _ = index.search(q, k, n_probe=n_probe)
+            times.append(time.perf_counter() - start)
+            hits += len(expected & set(ids.tolist()))
+        label = f"ivf n_probe={n_probe}"
+        print(f"{label:<16}{hits / (k * len(queries)):>10.3f}{percentile_ms(times, 50):>10.2f}{percentile_ms(times, 95):>10.2f}")
+    print()
+
+
+def _memory_mb() -> dict:
+    """Current RSS and PSS (shared pages split between processes) in MB, from /proc."""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key.lower()] = int(rest.split()[0]) / 1024
+    return values
+
+
+def _index_worker(n_docs: int, index_dir, barrier, results):
+    companies = [{'company': f"Company {i}", 'notes': doc} for i, doc in enumerate(synthetic_documents(n_docs))]
+    before = _memory_mb()['rss']
+    engine = CompanySearchEngine(companies, index_dir=index_dir)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    engine.search("hybrid office three days collaboration")
+    barrier.wait()
+    steady = _memory_mb()
+    results.put({'before': before, 'peak': peak, 'rss': steady['rss'], 'pss': steady['pss'],
+                 'matrix_mb': engine.tfidf_matrix.nbytes / 1e6})
+    barrier.wait()
+
+
+def benchmark_index_memory(n_docs: int = 5_000, workers: int = 4):
+    """Peak RSS while building the TF-IDF index, and steady-state memory with several workers."""
+    print(f"TF-IDF index memory: {n_docs:,} documents, {workers} workers")
+    print("=" * 60)
+    ctx = multiprocessing.get_context('spawn')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, index_dir in (("in-memory", None), ("memory-mapped", tmp)):
+            if index_dir:
+                # Build the shared file once, as a deploy step would
+                _run_workers(ctx, n_docs, index_dir, 1)
+            stats = _run_workers(ctx, n_docs, index_dir, workers)
+            print(f"{label}: matrix {stats[0]['matrix_mb']:.0f} MB")
+            print(f"  peak RSS during build: {max(s['peak'] for s in stats):.0f} MB "
+                  f"(RSS before build {stats[0]['before']:.0f} MB)")
+            print(f"  steady state, {workers} workers: RSS sum {sum(s['rss'] for s in stats):.0f} MB, "
+                  f"PSS sum {sum(s['pss'] for s in stats):.0f} MB")
+    print()
+
+
+def _run_workers(ctx, n_docs: int, index_dir, workers: int) -> list:
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_index_worker, args=(n_docs, index_dir, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return stats
+
+
+def synthetic_vocabulary(n_terms: int, seed: int = 0) -> List[str]:
+    """Word-like terms made by joining fragments of real vocabulary words."""
+    engine = CompanySearchEngine(load_companies())
+    words = [w for w in engine.vocabulary if w.isalpha() and len(w) >= 4]
+    fragments = sorted({w[i:i + 3] for w in words for i in range(0, len(w) - 2, 3)})
+    rng = np.random.default_rng(seed)
+
+    terms = set(words)
+    while len(terms) < n_terms:
+        parts = rng.choice(fragments, size=rng.integers(2, 5))
+        terms.add(''.join(parts))
+    return sorted(terms)
+
+
+def misspell(word: str, rng) -> str:
+    """Apply one random deletion, insertion, substitution or transposition."""
+    i = int(rng.integers(0, len(word) - 1))
+    letter = chr(int(rng.integers(97, 123)))
+    op = rng.integers(0, 4)
+    if op == 0:
+        return word[:i] + word[i + 1:]
+    if op == 1:
+        return word[:i] + letter + word[i:]
+    if op == 2:
+        return word[:i] + letter + word[i + 1:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def benchmark_spelling(n_queries: int = 2000):
+    """Build time, memory and lookup latency of SymSpellIndex as the vocabulary grows."""
+    print(f"Typo lookup benchmark: {n_queries} misspelled terms per vocabulary size")
+    print("=" * 60)
+    print(f"{'terms':>9}{'build s':>9}{'deletes':>11}{'exact':>8}{'p50 ms':>9}{'p95 ms':>9}")
+
+    for n_terms in (2_000, 50_000, 300_000):
+        terms = synthetic_vocabulary(n_terms)
+        rng = np.random.default_rng(1)
+        counts = {t: int(c) for t, c in zip(terms, rng.integers(1, 100, size=len(terms)))}
+
+        start = time.perf_counter()
+        index = SymSpellIndex().build(counts)
+        build = time.perf_counter() - start
+
+        originals = [t for t in rng.choice(terms, size=n_queries) if len(t) >= 5]
+        times = []
+        exact = 0
+        for word in originals:
+            typo = misspell(word, rng)
+            start = time.perf_counter()
+            corrected = index.lookup(typo, max_distance=1 if len(typo) < 8 else 2)
+            times.append(time.perf_counter() - start)
+            exact += corrected == word
+        print(f"{len(terms):>9,}{build:>9.1f}{len(index.deletes):>11,}{exact / len(originals):>8.3f}"
+              f"{percentile_ms(times, 50):>9.3f}{percentile_ms(times, 95):>9.3f}")
+    print()
+
+
+CONTEXT_QUERIES = [
+    "Which tech companies are fully remote?",
+    "Compare Google and Microsoft",
+    "Who's tightening RTO?",
+    "Which banks require 5 days in the office?",
+    "What do executives say about collaboration and innovation?",
+    "Companies with badge tracking",
+    "Hybrid policies in healthcare",
+    "Who said 'irreplaceable benefits of in-person collaboration'?",
+]
+
+
+def legacy_company_context(companies: list) -> str:
+    """The fixed per-company template used before context packing, for comparison."""
+    parts = []
+    for result in companies:
+        company = result['company']
+        wp = company.get('work_policy', {})
+        innovation = company.get('innovation', {})
+        employees = company.get('employee_count', 'Unknown')
+        parts.append(f"""Company: {company.get('company', 'Unknown')}
+Sector: {company.get('sector', 'Unknown')}
+Industry: {company.get('industry_sector', 'Unknown')}
+Headquarters: {company.get('headquarters', 'Unknown')}
+Employees: {employees:,}
+Innovation Rank: #{innovation.get('overall_rank', 'N/A')}
+
+Work Policy:
+- Type: {wp.get('type', 'Unknown')}
+- Category: {wp.get('category', 'Unknown')}
+- Days in Office: {wp.get('days_required', 'Unknown')}
+- Trend: {wp.get('trend_direction', 'Unknown')}
+- Effective Date: {wp.get('effective_date', 'Unknown')}
+- Details: {wp.get('details', 'No details available')}
+
+Key Quote: "{company.get('key_quote', 'No quote available')}\"""")
+    return "\n\n---\n\n".join(parts)
+
+
+def benchmark_context():
+    """Estimated context tokens: legacy template on the top 5 vs the packer on the top 8."""
+    print("Context packing: estimated input tokens per query")
+    print("=" * 60)
+    engine = CompanySearchEngine(load_companies())
+    print(f"{'query':<52}{'legacy':>8}{'packed':>8}{'cos':>5}")
+    totals = [0, 0]
+    for query in CONTEXT_QUERIES:
+        legacy = legacy_company_context(engine.search(query, top_k=5))
+        results = engine.search(query, top_k=8)
+        packed = format_company_context(results)
+        counts = (estimate_tokens(legacy), estimate_tokens(packed))
+        totals = [t + c for t, c in zip(totals, counts)]
+        print(f"{query[:50]:<52}{counts[0]:>8}{counts[1]:>8}{packed.count('Company: '):>5}")
+    print(f"{'total':<52}{totals[0]:>8}{totals[1]:>8}  ({1 - totals[1] / totals[0]:.0%} fewer)")
+    print()
+
+
+def benchmark_context_fragments(repeats: int = 200):
+    """Context formatting per turn: rendering every block vs joining pre-rendered fragments."""
+    print("Context fragments: formatting time per turn")
+    print("=" * 60)
+    engine = CompanySearchEngine(load_companies())
+    results = [engine.search(query, top_k=8) for query in CONTEXT_QUERIES]
+    for label, kwargs in (("render per turn", {}), ("fragments", {'fragments': engine.context_fragments})):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for r in results:
+                format_company_context(r, **kwargs)
+        print(f"{label:<20}{(time.perf_counter() - start) / (repeats * len(results)) * 1e6:>10.1f} us")
+
+    changed = [dict(c) for c in engine.companies]
+    changed[0]['employee_count'] = 'Unknown'
+    start = time.perf_counter()
+    rendered = engine.context_fragments.sync(changed)
+    print(f"sync after 1 changed record: {rendered} re-rendered in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print()
+
+
+if __name__ == "__main__":
+    n_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    benchmark_ann(n_docs)
+    benchmark_index_memory()
+    benchmark_spelling()
+    benchmark_context()
+    benchmark_context_fragments()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Browser messages and server CPU per streamed answer, with and without coalescing.
+
+Runs st.write_stream headless through Streamlit's AppTest on a simulated
+answer (token-sized deltas at a fixed rate) and counts the chunks that
+reach the UI, each of which is one message to the browser.
+
+Run from the repository root:
+    python -m utils.benchmark_streaming
+"""
+
+from streamlit.testing.v1 import AppTest
+
+
+def _stream_app():
+    # Runs inside AppTest, so it has to be self-contained
+    import time
+
+    import streamlit as st
+
+    from utils.fake_llm_server import ANSWER_WORDS
+    from utils.streaming import coalesce_stream
+
+    def deltas(n_tokens, rate):
+        next_at = time.perf_counter()
+        for i in range(n_tokens):
+            word = ANSWER_WORDS[i % len(ANSWER_WORDS)]
+            yield word if i == 0 else ' ' + word
+            next_at += 1 / rate
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+
+    sent = []
+
+    def counted(chunks):
+        for chunk in chunks:
+            sent.append(chunk)
+            yield chunk
+
+    flush = st.session_state['flush_interval']
+    stream = deltas(st.session_state['n_tokens'], st.session_state['token_rate'])
+    if flush is not None:
+        stream = coalesce_stream(stream, flush_interval=flush)
+
+    cpu = time.process_time()
+    st.write_stream(counted(stream))
+    st.session_state['result'] = (len(sent), time.process_time() - cpu)
+
+
+def benchmark_streaming(n_tokens: int = 300, token_rate: float = 100.0):
+    print(f"Streamed answer: {n_tokens} deltas at {token_rate:.0f} tokens/s")
+    print("=" * 60)
+    print(f"{'flush interval':<18}{'messages':>10}{'CPU ms':>10}")
+    for flush in (None, 0.05, 0.1, 0.25):
+        app = AppTest.from_function(_stream_app, default_timeout=n_tokens / token_rate + 30)
+        app.session_state['flush_interval'] = flush
+        app.session_state['n_tokens'] = n_tokens
+        app.session_state['token_rate'] = token_rate
+        app.run()
+        messages, cpu = app.session_state['result']
+        label = "per delta" if flush is None else f"{flush * 1000:.0f} ms"
+        print(f"{label:<18}{messages:>10}{cpu * 1000:>10.0f}")
+    print()
+
+
+if __name__ == "__main__":
+    benchmark_streaming()
@@ -0,0 +1,210 @@
+"""
+One Research Assistant chat turn, shared by app.py and the load test.
+
+handle_turn() runs every step of answering a question: follow-up
+resolution, aggregate answers, search over the candidate companies,
+context packing, model routing, the response cache and the queued,
+prefetched and coalesced model stream, then records the turn in the
+conversation memory. What the user sees at each step goes through a
+TurnUI: app.py renders it with Streamlit, the load test uses the
+headless default, so load tests drive the same code as real sessions.
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import anthropic
+import numpy as np
+
+from utils.aggregates import AggregateEngine
+from utils.chatbot import CompanySearchEngine, create_system_blocks, format_company_context, generate_response_prompt
+from utils.conversation import ConversationMemory
+from utils.llm_client import AssistantBusyError, AssistantClient
+from utils.model_router import ModelRouter
+from utils.rate_limit import Ticket
+from utils.response_cache import CachedResponse, ResponseCache, replay_stream
+from utils.streaming import coalesce_stream, prefetch_stream
+from utils.telemetry import annotate, record, span
+
+NO_RESULTS_MESSAGE = "I couldn't find matching companies. Try asking about specific companies, sectors, or policy types."
+
+
+@dataclass
+class AssistantServices:
+    """The process-wide objects a turn uses (app.py keeps them in st.cache_resource)."""
+    engine: CompanySearchEngine
+    aggregates: AggregateEngine
+    router: ModelRouter
+    response_cache: Optional[ResponseCache] = None
+    client: Optional[AssistantClient] = None  # None without an API key
+
+
+@dataclass
+class TurnOutcome:
+    answer: str
+    failed: bool = False
+    error: Optional[str] = None  # Exception type name when failed
+    companies: List[str] = field(default_factory=list)  # Companies the turn discussed
+
+
+class TurnUI:
+    """How a turn is shown. The defaults show nothing and read streamed answers to the end."""
+
+    def show_message(self, text: str, caption: Optional[str] = None):
+        """A complete answer: aggregate, no-results or no-API-key fallback."""
+
+    def show_cards(self, results: List[Dict[str, Any]]):
+        """Retrieved companies, shown while the model answer is on its way."""
+
+    def wait_in_queue(self, ticket: Ticket):
+        """Called while the model call is queued behind others; returns once it is admitted or gave up."""
+
+    def stream_answer(self, chunks: Iterator[str]) -> str:
+        """Show a streamed answer and return its full text."""
+        return ''.join(chunks)
+
+    def show_cache_hit(self, cached: CachedResponse, stats: Dict[str, Any]):
+        """After a cached answer was replayed."""
+
+    def show_error(self, text: str, warning: bool = False):
+        """A failed turn (warning for capacity and rate limits, error otherwise)."""
+
+
+def fallback_answer(results: List[Dict[str, Any]]) -> str:
+    """Answer listing the retrieved companies, used without an API key."""
+    companies_found = [r['company'].get('company', 'Unknown') for r in results]
+    answer = f"**Found {len(results)} companies:** {', '.join(companies_found)}\n\n"
+    for result in results[:3]:
+        company = result['company']
+        wp = company.get('work_policy', {})
+        answer += f"**{company.get('company', 'Unknown')}** - {wp.get('type', 'Unknown')} ({wp.get('days_required', 'N/A')} days)\n\n"
+    answer += "\n*Add Anthropic API key for AI-generated insights.*"
+    return answer
+
+
+def handle_turn(services: AssistantServices, memory: ConversationMemory, question: str, ui: Optional[TurnUI] = None,
+                session: Optional[str] = None,
+                candidates: Union[np.ndarray, Iterable, None] = None) -> TurnOutcome:
+    """
+    Answer one question and record the turn in memory (unless it failed).
+
+    Args:
+        services: Search engine, aggregates, router, response cache and client
+        memory: The session's conversation memory
+        question: The question as asked
+        ui: Display hooks (default: headless)
+        session: Fair-queue key for the session's model calls
+        candidates: Companies to search (e.g. the sidebar selection; default: all)
+    """
+    ui = ui or TurnUI()
+    engine = services.engine
+    turn_start = time.perf_counter()
+
+    # Follow-ups like "what about their trend?" are resolved to the companies discussed last
+    retrieval_query = memory.resolve_query(question, bool(engine.entity_matcher.find(question)),
+                                           bool(engine.parse_query(question)))
+
+    # Counts, averages and lists are computed from the indexed columns, without the LLM
+    with span('aggregate'):
+        aggregate = services.aggregates.answer(retrieval_query, candidates=candidates)
+    annotate(answer='aggregate' if aggregate is not None else 'retrieval')
+
+    if aggregate is not None:
+        ui.show_message(aggregate.text, caption="Computed directly from the dataset")
+        companies = ([engine.companies[row].get('company', '') for row in aggregate.rows]
+                     if len(aggregate.rows) <= 10 else [])
+        outcome = TurnOutcome(aggregate.text, companies=companies)
+    else:
+        # The context packer decides by score gap and token budget how many results the model sees
+        results = engine.search(retrieval_query, top_k=8, candidates=candidates)
+        if not results:
+            ui.show_message(NO_RESULTS_MESSAGE)
+            outcome = TurnOutcome(NO_RESULTS_MESSAGE)
+        else:
+            outcome = _answer_from_results(services, memory, question, results, ui, session, turn_start)
+
+    annotate(failed=outcome.failed)
+    if not outcome.failed:
+        memory.add_turn(question, outcome.answer, outcome.companies)
+    return outcome
+
+
+def _answer_from_results(services: AssistantServices, memory: ConversationMemory, question: str,
+                         results: List[Dict[str, Any]], ui: TurnUI, session: Optional[str],
+                         turn_start: float) -> TurnOutcome:
+    engine = services.engine
+    companies = [r['company'].get('company', '') for r in results[:5]]
+    with span('context_format'):
+        context = format_company_context(results, fragments=engine.context_fragments)
+
+    if services.client is None:
+        answer = fallback_answer(results)
+        ui.show_message(answer)
+        return TurnOutcome(answer, companies=companies)
+
+    answer_stream = None
+    try:
+        # Simple lookups go to a faster model, comparisons and syntheses to the larger one
+        route = services.router.route(question, context)
+        # Static, prompt-cached prefix: system prompt plus dataset digest
+        system_blocks = create_system_blocks(engine.dataset_digest)
+        cache = services.response_cache
+        cached = cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(question, results, route.model, json.dumps(system_blocks), memory.digest())
+            with span('response_cache'):
+                cached = cache.get(cache_key)
+            annotate(response_cache_hit=cached is not None)
+
+        if cached is None:
+            start = time.perf_counter()
+            # Start the model call before rendering anything, so it runs while the cards show.
+            # It waits its turn in the process-wide queue on the background thread.
+            ticket = services.client.enqueue(session)
+            answer_stream = prefetch_stream(services.router.timed(route, services.client.stream_text(
+                model=route.model,
+                max_tokens=route.max_tokens,
+                system=system_blocks,
+                # Recent turns verbatim, older ones as a rolling summary
+                messages=memory.messages(generate_response_prompt(question, context)),
+                ticket=ticket,
+            ), ticket=ticket), ticket=ticket)
+
+        ui.show_cards(results)
+        record('ui.cards_visible', time.perf_counter() - turn_start)
+
+        if cached is not None:
+            # Replay through the same streaming path as a live answer
+            answer = ui.stream_answer(replay_stream(cached.answer))
+            ui.show_cache_hit(cached, cache.stats())
+        else:
+            if ticket.pending:
+                ui.wait_in_queue(ticket)
+            # Deltas batched into ~100ms chunks for the UI
+            answer = ui.stream_answer(coalesce_stream(answer_stream))
+            if cache is not None:
+                cache.put(cache_key, answer, time.perf_counter() - start)
+        return TurnOutcome(answer, companies=companies)
+
+    except AssistantBusyError as e:
+        message = "The assistant is answering many questions right now. Please try again in a moment."
+        ui.show_error(message, warning=True)
+        return TurnOutcome(message, failed=True, error=type(e).__name__)
+    except anthropic.RateLimitError as e:
+        message = "The AI service is rate limiting requests. Please try again in a minute."
+        ui.show_error(message, warning=True)
+        return TurnOutcome(message, failed=True, error=type(e).__name__)
+    except anthropic.APIConnectionError as e:
+        message = "Couldn't reach the AI service (connection error or timeout). Please try again."
+        ui.show_error(message)
+        return TurnOutcome(message, failed=True, error=type(e).__name__)
+    except Exception as e:
+        message = f"Error: {str(e)}"
+        ui.show_error(message)
+        return TurnOutcome(message, failed=True, error=type(e).__name__)
+    finally:
+        # A rerun, stop or error before the answer was read cancels the call and frees its slot
+        if answer_stream is not None:
+            answer_stream.close()
@@ -4,25 +4,414 @@ RAG Chatbot for America's Top 100 Innovators
 Uses semantic search to find relevant companies and Claude to generate responses.
 """
 
+import hashlib
 import json
+import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Union
 import numpy as np
 
+from utils.phrase_index import PhraseIndex, quoted_phrases
+from utils.spelling import SymSpellIndex, is_plausible_typo
+from utils.telemetry import annotate, record, span
+from utils.vector_index import HashedNgramEmbedder, IVFIndex
+
 # Simple TF-IDF based search (no external API needed)
-from collections import Counter
+from collections import Counter, OrderedDict, deque
 import re
 import math
+import threading
+import time
+
+# Query phrases that resolve to indexed column values (see parse_query)
+SECTOR_ALIASES = {
+    'tech': ['Technology'],
+    'software': ['Technology'],
+    'healthcare': ['Health Care'],
+    'hospital': ['Health Care'],
+    'hospitals': ['Health Care'],
+    'pharma': ['Health Care'],
+    'pharmaceutical': ['Health Care'],
+    'finance': ['Financials'],
+    'financial': ['Financials'],
+    'bank': ['Financials'],
+    'banks': ['Financials'],
+    'banking': ['Financials'],
+    'insurance': ['Financials'],
+    'insurers': ['Financials'],
+    'industrial': ['Industrials'],
+    'manufacturing': ['Industrials'],
+    'retail': ['Retailing'],
+    'retailer': ['Retailing'],
+    'retailers': ['Retailing'],
+    'telecom': ['Telecommunications', 'Communication Services'],
+    'aerospace': ['Aerospace & Defense'],
+    'defense': ['Aerospace & Defense'],
+    'food': ['Food, Beverages & Tobacco', 'Food/Beverages'],
+    'beverage': ['Food, Beverages & Tobacco', 'Food/Beverages'],
+    'beverages': ['Food, Beverages & Tobacco', 'Food/Beverages'],
+    'oil': ['Energy'],
+    'entertainment': ['Media'],
+    'consumer': ['Consumer Discretionary', 'Household Products'],
+    'automotive': ['Motor Vehicles & Parts'],
+    'logistics': ['Transportation'],
+    'chemicals': ['Materials'],
+}
+
+CATEGORY_PHRASES = {
+    'fully remote': 'Fully Remote',
+    'remote first': 'Fully Remote',
+    'remote only': 'Fully Remote',
+    'all remote': 'Fully Remote',
+    'full office': 'Full Office',
+    'fully in office': 'Full Office',
+    'full time in office': 'Full Office',
+    'office only': 'Full Office',
+    'hybrid': 'Hybrid',
+}
+
+# Bare office forms, matched on the lowercased question; "days in office" names no category.
+# Bare "remote" and "work from home" are left to text scoring: "from remote to 5 days" or
+# "work remote 2 days a week" do not ask for Fully Remote companies.
+CATEGORY_PATTERNS = [
+    (re.compile(r'(?<![\w-])in-office(?![\w-])'), 'Full Office'),
+    (re.compile(r'(?<![\w-])office[- ]first(?![\w-])'), 'Full Office'),
+]
+
+# Words that negate a constraint right after them ("not fully remote", "aren't hybrid");
+# 't' is what tokenizing leaves of "n't"
+NEGATION_WORDS = {'not', 'no', 'non', 'never', 'without', 'except', 'excluding', 't',
+                  'arent', 'isnt', 'dont', 'doesnt', 'didnt'}
+
+# Token prefixes -> trend_direction value
+TREND_PREFIXES = {
+    'tighten': 'Tightening',
+    'stricter': 'Tightening',
+    'relax': 'Relaxing',
+    'loosen': 'Relaxing',
+    'stable': 'Maintaining',
+    'maintain': 'Maintaining',
+    'unchanged': 'Maintaining',
+}
+
+NUMBER_WORDS = {'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5}
+
+_DAY_NUMBER = r'(?:[0-5]|zero|one|two|three|four|five)'
+
+# Day counts, alone, as lists ("3 or 4", "2, 3 or 4") or ranges ("2-3", "2 to 3", "between 2 and 3")
+_DAYS_PATTERN = re.compile(
+    r'(?:\b(at least|minimum of|no fewer than|no less than|more than|over|fewer than|less than|under'
+    r'|at most|up to|no more than|between)\s+)?'
+    rf'\b({_DAY_NUMBER}(?:\s*(?:,|-|–|\bto\b|\bor\b|\band\b)\s*{_DAY_NUMBER})*)'
+    r'(\+|\s+or\s+(?:more|fewer|less))?[\s-]*days?\b'
+)
+
+
+# Common names and abbreviations -> company name as stored in the dataset
+COMPANY_ALIASES = {
+    'google': 'Alphabet',
+    'youtube': 'Alphabet',
+    'aws': 'Amazon',
+    'amd': 'Advanced Micro Devices (AMD)',
+    'jpmorgan': 'JPMorgan Chase',
+    'jp morgan': 'JPMorgan Chase',
+    'chase': 'JPMorgan Chase',
+    'j&j': 'Johnson & Johnson',
+    'bofa': 'Bank of America',
+    'exxon': 'Exxon Mobil',
+    'exxonmobil': 'Exxon Mobil',
+    'disney': 'Walt Disney',
+    'pepsi': 'PepsiCo',
+    'coke': 'Coca-Cola',
+    'p&g': 'Procter & Gamble',
+    'amex': 'American Express',
+    'schwab': 'Charles Schwab',
+    'goldman': 'Goldman Sachs Group',
+    'unitedhealthcare': 'UnitedHealth Group',
+    'lockheed': 'Lockheed Martin',
+    'northrop': 'Northrop Grumman',
+    'booz allen': 'Booz Allen Hamilton',
+    'thermo fisher': 'Thermo Fisher Scientific',
+    'mayo': 'Mayo Clinic',
+    'mass general': 'Mass General Brigham',
+    'black & decker': 'Stanley Black & Decker',
+    'black and decker': 'Stanley Black & Decker',
+    'hewlett packard': 'HP Inc',
+    'att': 'AT&T',
+    'rockwell': 'Rockwell Automation',
+    'choa': "Children's Healthcare of Atlanta",
+}
+
+# Question words that are not in the vocabulary but must not be spell-corrected
+QUERY_STOPWORDS = {
+    'tell', 'me', 'why', 'compare', 'comparison', 'explain', 'describe',
+    'summarize', 'summary', 'please', 'versus', 'between', 'which', 'what',
+    'about', 'their', 'these', 'those', 'there', 'should', 'would', 'could',
+}
+
+# Words parse_query reads are never spell-corrected: "unchanged" -> "changed" would drop a filter
+PARSED_WORDS = (set(NUMBER_WORDS) | set(SECTOR_ALIASES)
+                | {word for phrase in CATEGORY_PHRASES for word in phrase.split()})
+
+# Trailing words dropped to form a company's short name ("Cisco Systems" -> "cisco")
+NAME_SUFFIXES = {
+    'inc', 'corp', 'corporation', 'co', 'company', 'group', 'holdings',
+    'systems', 'technologies', 'technology', 'communications', 'laboratories',
+    'solutions', 'insurance', 'services', 'financial', 'electric', 'industries',
+}
+
+# Name patterns that are also everyday words; only matched when capitalized in the query
+AMBIGUOUS_NAMES = {
+    'target', 'visa', 'charter', 'dash', 'hartford', 'corning', 'microchip',
+    'chase', 'ah', 'at t', 'p g', 'j j',
+}
+
+
+class EntityMatcher:
+    """
+    Find company mentions in a query in a single pass.
+
+    Patterns (full names, short names and aliases) are token sequences stored
+    in a hash-based trie with Aho-Corasick failure links, so every mention is
+    found in one left-to-right scan of the query tokens.
+    """
+
+    def __init__(self, companies: List[Dict[str, Any]]):
+        self.goto = [{}]     # state -> {token: next state}
+        self.fail = [0]
+        self.output = [[]]   # state -> [(pattern length, row, pattern text)]
+        self._build(companies)
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return re.findall(r'\w+', text.lower())
+
+    def _short_name(self, name: str) -> List[str]:
+        tokens = self._tokens(re.sub(r'\(.*?\)', '', name))
+        while len(tokens) > 1 and tokens[-1] in NAME_SUFFIXES:
+            tokens.pop()
+        return tokens
+
+    def _add(self, tokens: List[str], row: int):
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            nxt = self.goto[state].get(token)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][token] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        entry = (len(tokens), row, ' '.join(tokens))
+        if entry not in self.output[state]:
+            self.output[state].append(entry)
+
+    def _build(self, companies: List[Dict[str, Any]]):
+        rows_by_name = {}
+        for row, company in enumerate(companies):
+            name = company.get('company', '')
+            if not name:
+                continue
+            rows_by_name.setdefault(name, row)
+            self._add(self._tokens(name), row)
+            self._add(self._short_name(name), row)
+
+        for alias, name in COMPANY_ALIASES.items():
+            if name in rows_by_name:
+                self._add(self._tokens(alias), rows_by_name[name])
+
+        # Breadth-first pass to set failure links and merge outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(token, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find(self, query: str) -> List[int]:
+        """Return the dataset rows of companies mentioned in the query, in mention order."""
+        spans = [(m.group(0), m.start()) for m in re.finditer(r'\w+', query)]
+        found = []
+        seen = set()
+        state = 0
+
+        for i, (original, _) in enumerate(spans):
+            token = original.lower()
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+
+            for length, row, pattern in self.output[state]:
+                if row in seen:
+                    continue
+                if pattern in AMBIGUOUS_NAMES:
+                    matched = ' '.join(o for o, _ in spans[i - length + 1:i + 1])
+                    if not any(ch.isupper() for ch in matched):
+                        continue
+                seen.add(row)
+                found.append(row)
+
+        return found
+
+
+def _negated(words: List[str]) -> bool:
+    """Whether one of the (up to) three words before a constraint negates it."""
+    return any(word in NEGATION_WORDS for word in words[-3:])
+
+
+def _parse_days(text: str, matched: Optional[set] = None, negated: Optional[set] = None) -> set:
+    """
+    Resolve phrases like '4 days', 'three-day', '3 or 4 days', '2-3 days' or 'at least 3 days'
+    to allowed day counts.
+
+    Phrases right after a negation ("don't require 5 days") are skipped. The
+    words of the phrases read go into matched, those of skipped ones into negated.
+    """
+    allowed = set()
+    for match in _DAYS_PATTERN.finditer(text):
+        words = re.findall(r'\w+', match.group(0))
+        if _negated(re.findall(r'\w+', text[:match.start()])):
+            if negated is not None:
+                negated.update(words)
+            continue
+        if matched is not None:
+            matched.update(words)
+
+        qualifier, numbers, suffix = match.groups()
+        suffix = ' '.join((suffix or '').split())
+        values = [NUMBER_WORDS[n] if n in NUMBER_WORDS else int(n) for n in re.findall(_DAY_NUMBER, numbers)]
+        if qualifier == 'between' or re.search(r'-|–|\bto\b', numbers):
+            allowed.update(range(min(values), max(values) + 1))
+            continue
+
+        for n in values:
+            if suffix in ('+', 'or more') or qualifier in ('at least', 'minimum of', 'no fewer than',
+                                                            'no less than'):
+                allowed.update(range(n, 6))
+            elif qualifier in ('more than', 'over'):
+                allowed.update(range(n + 1, 6))
+            elif qualifier in ('fewer than', 'less than', 'under'):
+                allowed.update(range(0, n))
+            elif suffix or qualifier in ('at most', 'up to', 'no more than'):
+                allowed.update(range(0, n + 1))
+            else:
+                allowed.add(n)
+    return allowed
+
+
+def _state_from_headquarters(headquarters: str) -> str:
+    """Extract the state from 'City, State, USA'."""
+    parts = [p.strip() for p in (headquarters or '').split(',')]
+    if len(parts) >= 3:
+        return parts[-2]
+    return ''
+
+
+class SearchCache:
+    """Bounded, thread-safe LRU cache for search results with hit-rate statistics."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop all entries (called when the index is rebuilt)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
 
 class CompanySearchEngine:
     """Simple TF-IDF based search engine for company data."""
 
-    def __init__(self, companies: List[Dict[str, Any]]):
+    def __init__(self, companies: List[Dict[str, Any]], cache_size: int = 512,
+                 scorer: str = 'tfidf', dense_weight: float = 0.5, ann_threshold: int = 5000,
+                 index_dir: Optional[str] = None):
+        """
+        Args:
+            companies: Company records
+            cache_size: Maximum number of memoized search results
+            scorer: 'tfidf', 'dense' (hashed n-gram embeddings) or 'hybrid'
+            dense_weight: Share of the dense score in hybrid mode
+            ann_threshold: Corpus size from which dense search uses the IVF index
+            index_dir: Optional directory for a memory-mapped TF-IDF matrix
+                shared by all worker processes
+        """
+        if scorer not in ('tfidf', 'dense', 'hybrid'):
+            raise ValueError(f"Unknown scorer: {scorer}")
         self.companies = companies
+        self.scorer = scorer
+        self.dense_weight = dense_weight
+        self.ann_threshold = ann_threshold
+        self.index_dir = index_dir
         self.documents = []
         self.tfidf_matrix = []
         self.vocabulary = {}
+        self.doc_freq = Counter()
+        self.spelling_index = None
+        self.embedder = None
+        self.dense_matrix = None
+        self.ann_index = None
+        self.column_indexes = {}
+        self.phrase_index = None
+        self.dataset_digest = ''
+        self.context_fragments = ContextFragments()
+        self.index_version = 0
+        self.search_cache = SearchCache(cache_size)
+        self.rebuild()
+
+    def rebuild(self, companies: Optional[List[Dict[str, Any]]] = None):
+        """(Re)build all indexes, bump the index version and invalidate cached results."""
+        if companies is not None:
+            self.companies = companies
         self._build_index()
+        self.spelling_index = SymSpellIndex().build(self.doc_freq)
+        if self.scorer != 'tfidf':
+            self._build_dense_index()
+        self._build_column_indexes()
+        self.entity_matcher = EntityMatcher(self.companies)
+        self.phrase_index = PhraseIndex(self.companies)
+        self.dataset_digest = build_dataset_digest(self.companies)
+        self.context_fragments.sync(self.companies)
+        self.index_version += 1
+        self.search_cache.invalidate()
 
     def _create_document(self, company: Dict[str, Any]) -> str:
         """Create a searchable text document from company data."""
@@ -45,26 +434,6 @@ class CompanySearchEngine:
             f"rank {innovation.get('overall_rank', '')}",
         ]
 
-        # Add tags based on policy
-        days = wp.get('days_required', 0)
-        if days == 0:
-            parts.append("remote fully remote work from home")
-        elif days <= 2:
-            parts.append("flexible hybrid remote-friendly")
-        elif days == 3:
-            parts.append("hybrid three days")
-        elif days >= 4:
-            parts.append("office-first strict in-office")
-        if days == 5:
-            parts.append("full office mandatory")
-
-        # Add trend tags
-        trend = wp.get('trend_direction', '').lower()
-        if 'tightening' in trend:
-            parts.append("tightening stricter more office")
-        elif 'relaxing' in trend:
-            parts.append("relaxing flexible less strict")
-
         return ' '.join(parts).lower()
 
     def _tokenize(self, text: str) -> List[str]:
@@ -72,17 +441,22 @@ class CompanySearchEngine:
         return re.findall(r'\b\w+\b', text.lower())
 
     def _build_index(self):
-        """Build TF-IDF index for all companies."""
+        """
+        Build TF-IDF index for all companies.
+
+        The matrix is filled row by row into one preallocated float32 buffer
+        (no per-document arrays). With index_dir set, the buffer is a
+        memory-mapped .npy file named after the corpus fingerprint, so other
+        worker processes map the same file instead of building their own copy.
+        """
         # Create documents
         self.documents = [self._create_document(c) for c in self.companies]
 
-        # Build vocabulary
+        # Term counts per document and vocabulary
+        doc_counts = [Counter(self._tokenize(doc)) for doc in self.documents]
         all_tokens = set()
-        doc_tokens = []
-        for doc in self.documents:
-            tokens = self._tokenize(doc)
-            doc_tokens.append(tokens)
-            all_tokens.update(tokens)
+        for counts in doc_counts:
+            all_tokens.update(counts)
 
         self.vocabulary = {word: i for i, word in enumerate(sorted(all_tokens))}
         vocab_size = len(self.vocabulary)
@@ -90,93 +464,644 @@ class CompanySearchEngine:
         # Calculate TF-IDF
         n_docs = len(self.documents)
 
-        # Document frequency
+        # Document frequency -> IDF per vocabulary column
         df = Counter()
-        for tokens in doc_tokens:
-            df.update(set(tokens))
+        for counts in doc_counts:
+            df.update(counts.keys())
+        idf = np.empty(vocab_size, dtype=np.float32)
+        for word, idx in self.vocabulary.items():
+            idf[idx] = math.log(n_docs / (1 + df[word]))
+        self.doc_freq = df
 
-        # Build TF-IDF matrix
-        self.tfidf_matrix = []
-        for tokens in doc_tokens:
-            tf = Counter(tokens)
-            tfidf = np.zeros(vocab_size)
-            for word, count in tf.items():
-                if word in self.vocabulary:
-                    idx = self.vocabulary[word]
-                    idf = math.log(n_docs / (1 + df[word]))
-                    tfidf[idx] = count * idf
+        shape = (n_docs, vocab_size)
+        index_path = None
+        if self.index_dir:
+            index_path = Path(self.index_dir) / f"tfidf_{self._corpus_fingerprint()}.npy"
+            matrix = self._load_mapped_matrix(index_path, shape)
+            if matrix is not None:
+                self.tfidf_matrix = matrix
+                return
+
+        if index_path is None:
+            matrix = np.zeros(shape, dtype=np.float32)
+        else:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+            matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=shape)
+
+        for row, counts in enumerate(doc_counts):
+            if not counts:
+                continue
+            cols = np.fromiter((self.vocabulary[w] for w in counts), dtype=np.intp, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            values = tf * idf[cols]
             # Normalize
-            norm = np.linalg.norm(tfidf)
+            norm = np.sqrt(np.dot(values, values))
             if norm > 0:
-                tfidf = tfidf / norm
-            self.tfidf_matrix.append(tfidf)
+                values /= norm
+            matrix[row, cols] = values
+
+        if index_path is not None:
+            # Publish atomically, then map read-only like every other worker
+            matrix.flush()
+            del matrix
+            os.replace(tmp_path, index_path)
+            matrix = self._load_mapped_matrix(index_path, shape)
+
+        self.tfidf_matrix = matrix
+
+    def _corpus_fingerprint(self) -> str:
+        """Short hash of all documents, used to name the shared index file."""
+        digest = hashlib.sha1()
+        for doc in self.documents:
+            digest.update(doc.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()[:16]
 
-        self.tfidf_matrix = np.array(self.tfidf_matrix)
+    @staticmethod
+    def _load_mapped_matrix(path: Path, shape: tuple) -> Optional[np.ndarray]:
+        """Map an existing index file read-only, or return None if it is missing or stale."""
+        if not path.exists():
+            return None
+        matrix = np.load(path, mmap_mode='r')
+        if matrix.shape != shape or matrix.dtype != np.float32:
+            return None
+        return matrix
 
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search for companies matching the query."""
-        # Tokenize query
+    def correct_query(self, query: str) -> str:
+        """
+        Replace misspelled words missing from the vocabulary with their closest vocabulary term.
+
+        Words of 5-7 letters allow one edit, longer words two. Shorter words,
+        words with digits, common question words and words parse_query reads
+        (PARSED_WORDS, trend words) are left alone, as are words with no
+        close match and words that differ from it by more than a typing slip
+        (see is_plausible_typo). Capitalization is kept.
+        """
+        def replace(match):
+            word = match.group(0)
+            token = word.lower()
+            if (token in self.vocabulary or token in QUERY_STOPWORDS or token in PARSED_WORDS
+                    or token.startswith(tuple(TREND_PREFIXES))
+                    or len(token) < 5 or not token.isalpha()):
+                return word
+            corrected = self.spelling_index.lookup(token, max_distance=1 if len(token) < 8 else 2)
+            if corrected is None or not is_plausible_typo(token, corrected):
+                return word
+            return corrected.capitalize() if word[0].isupper() else corrected
+
+        return re.sub(r'\w+', replace, query)
+
+    def _build_dense_index(self):
+        """Embed all documents; add an IVF index once the corpus is large enough."""
+        self.embedder = HashedNgramEmbedder().fit(self.documents)
+        self.dense_matrix = self.embedder.embed_many(self.documents)
+        self.ann_index = None
+        if len(self.documents) >= self.ann_threshold:
+            self.ann_index = IVFIndex().build(self.dense_matrix)
+
+    def _build_column_indexes(self):
+        """Index structured columns (days, category, trend, sector, state) to row arrays."""
+        indexes = {'days': {}, 'category': {}, 'trend': {}, 'sector': {}, 'state': {}}
+
+        for row, company in enumerate(self.companies):
+            wp = company.get('work_policy', {})
+            try:
+                days = int(wp.get('days_required', 0) or 0)
+            except (ValueError, TypeError):
+                days = 0
+
+            values = {
+                'days': days,
+                'category': wp.get('category', 'Unknown'),
+                'trend': wp.get('trend_direction', 'Unknown'),
+                'sector': company.get('sector', 'Unknown'),
+                'state': _state_from_headquarters(company.get('headquarters', '')),
+            }
+            for column, value in values.items():
+                indexes[column].setdefault(value, []).append(row)
+
+        self.column_indexes = {
+            column: {value: np.array(rows, dtype=np.intp) for value, rows in index.items()}
+            for column, index in indexes.items()
+        }
+
+    def parse_query(self, query: str, matched_terms: Optional[set] = None,
+                    negated_terms: Optional[set] = None) -> Dict[str, set]:
+        """
+        Recognize structured constraints in a question.
+
+        Returns a dict mapping column name ('days', 'category', 'trend',
+        'sector', 'state') to the set of accepted values. Columns the query
+        says nothing about are omitted, and so are constraints right after
+        a negation ("not fully remote", "aren't hybrid"): excluding values
+        is left to the text search and the model.
+
+        Args:
+            query: The question
+            matched_terms: Optional set that receives the query tokens the constraints were read from
+            negated_terms: Optional set that receives the tokens of negated constraints
+        """
         tokens = self._tokenize(query)
+        text = ' ' + ' '.join(tokens) + ' '
+        filters = {}
+        matched = set()
+        negated = set()
 
-        # Create query vector
-        vocab_size = len(self.vocabulary)
-        query_vec = np.zeros(vocab_size)
-        for token in tokens:
-            if token in self.vocabulary:
-                query_vec[self.vocabulary[token]] = 1
+        def mentions(phrase_tokens: List[str]) -> bool:
+            """Whether the phrase occurs in the query other than right after a negation."""
+            needle = f" {' '.join(phrase_tokens)} "
+            start = text.find(needle)
+            found = start != -1
+            while start != -1:
+                if not _negated(text[:start].split()):
+                    matched.update(phrase_tokens)
+                    return True
+                start = text.find(needle, start + 1)
+            if found:
+                negated.update(phrase_tokens)
+            return False
+
+        days = _parse_days(query.lower(), matched, negated)
+        if days:
+            filters['days'] = days
+
+        categories = set()
+        for phrase, value in CATEGORY_PHRASES.items():
+            if mentions(phrase.split()):
+                categories.add(value)
+        # With a day count, "in-office" describes those days rather than a category
+        if 'days' not in filters:
+            lowered = query.lower()
+            for pattern, value in CATEGORY_PATTERNS:
+                for match in pattern.finditer(lowered):
+                    words = self._tokenize(match.group(0))
+                    if _negated(self._tokenize(lowered[:match.start()])):
+                        negated.update(words)
+                        continue
+                    categories.add(value)
+                    matched.update(words)
+        if categories:
+            filters['category'] = categories
+
+        trends = set()
+        for i, token in enumerate(tokens):
+            for prefix, value in TREND_PREFIXES.items():
+                if token.startswith(prefix):
+                    if _negated(tokens[:i]):
+                        negated.add(token)
+                        continue
+                    trends.add(value)
+                    matched.add(token)
+        if trends:
+            filters['trend'] = trends
+
+        sectors = set()
+        for sector in self.column_indexes.get('sector', {}):
+            if mentions(self._tokenize(sector)):
+                sectors.add(sector)
+        for alias, names in SECTOR_ALIASES.items():
+            if mentions([alias]):
+                sectors.update(n for n in names if n in self.column_indexes.get('sector', {}))
+        if sectors:
+            filters['sector'] = sectors
+
+        states = set()
+        for state in self.column_indexes.get('state', {}):
+            state_tokens = self._tokenize(state) if state else []
+            if state_tokens and mentions(state_tokens):
+                states.add(state)
+        if states:
+            filters['state'] = states
+
+        if matched_terms is not None:
+            matched_terms.update(matched)
+        if negated_terms is not None:
+            negated_terms.update(negated - matched)
+        return filters
+
+    def resolve_filters(self, filters: Dict[str, set]) -> Optional[np.ndarray]:
+        """Resolve parsed filters to the sorted row indices matching all of them."""
+        if not filters:
+            return None
 
-        # Normalize
-        norm = np.linalg.norm(query_vec)
-        if norm > 0:
-            query_vec = query_vec / norm
+        rows = None
+        for column, values in filters.items():
+            index = self.column_indexes.get(column, {})
+            matched = [index[v] for v in values if v in index]
+            column_rows = np.unique(np.concatenate(matched)) if matched else np.zeros(0, dtype=np.intp)
+            rows = column_rows if rows is None else np.intersect1d(rows, column_rows)
+        return rows
 
-        # Calculate similarities
-        similarities = np.dot(self.tfidf_matrix, query_vec)
+    def candidate_rows(self, candidates: Union[np.ndarray, Iterable, None]) -> Optional[np.ndarray]:
+        """
+        Resolve a candidate filter to sorted row indices into self.companies.
 
-        # Get top results
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        Accepts a boolean mask with one entry per company, an iterable of
+        row indices, or an iterable of company names. Returns None when no
+        filter is given (search everything).
+        """
+        if candidates is None:
+            return None
+
+        values = candidates if isinstance(candidates, np.ndarray) else np.asarray(list(candidates))
+        if values.size == 0:
+            return np.zeros(0, dtype=np.intp)
+
+        if values.dtype == bool:
+            if len(values) != len(self.companies):
+                raise ValueError(
+                    f"Candidate mask has {len(values)} entries, expected {len(self.companies)}"
+                )
+            return np.flatnonzero(values)
+
+        if np.issubdtype(values.dtype, np.integer):
+            rows = np.unique(values.astype(np.intp))
+            return rows[(rows >= 0) & (rows < len(self.companies))]
+
+        # Company names
+        wanted = set(str(v) for v in values)
+        return np.array(
+            [i for i, c in enumerate(self.companies) if c.get('company') in wanted],
+            dtype=np.intp
+        )
+
+    def search(self, query: str, top_k: int = 5,
+               candidates: Union[np.ndarray, Iterable, None] = None) -> List[Dict[str, Any]]:
+        """
+        Search for companies matching the query.
+
+        Args:
+            query: Free-text question
+            top_k: Maximum number of results
+            candidates: Optional sidebar filter (boolean mask, row indices or
+                company names). Only these companies are scored and returned.
+
+        Companies named in the query are returned directly (all of them, in
+        mention order) without scoring. Quoted passages are matched against
+        quotes, policy details and notes, exact matches ranked first;
+        results then carry the matched snippets under 'matches'. Results are memoized per normalized
+        query, top_k, candidate set and index version.
+        """
+        with span('search'):
+            rows = self.candidate_rows(candidates)
+
+            key = (
+                self._cache_key(query),
+                top_k,
+                None if rows is None else rows.tobytes(),
+                self.index_version,
+            )
+            cached = self.search_cache.get(key)
+            annotate(search_cache_hit=cached is not None)
+            if cached is None:
+                cached = self._search(query, top_k, rows)
+                self.search_cache.put(key, cached)
+
+        # Copies so callers can't mutate cached entries
+        results = [dict(result) for result in cached]
+        for result in results:
+            if 'matches' in result:
+                result['matches'] = [dict(m) for m in result['matches']]
+        return results
+
+    def _cache_key(self, query: str) -> tuple:
+        """
+        Normalize a query to its sorted token multiset plus what that loses.
+
+        '3+' stays distinct from '3' (it changes the days filter). Whether an
+        ambiguous company name counts as a mention depends on case and word
+        order ("AT&T" vs "at&t"), so the companies the entity matcher finds
+        are part of the key, and words outside the vocabulary keep their case
+        for the spell-corrected lookup. The words after each negation
+        are kept too ("not in tech, hybrid" vs "in tech, not hybrid"), and
+        quoted phrases keep their word order.
+        """
+        tokens = []
+        for token in re.findall(r'\w+\+?', query):
+            lowered = token.lower()
+            tokens.append(lowered if lowered in self.vocabulary else token)
+        words = self._tokenize(query)
+        negated = tuple(tuple(words[i + 1:i + 4]) for i, word in enumerate(words) if word in NEGATION_WORDS)
+        phrases = tuple(' '.join(self._tokenize(p)) for p in quoted_phrases(query))
+        return tuple(sorted(tokens)), tuple(self.entity_matcher.find(query)), negated, phrases
+
+    def _phrase_search(self, phrases: List[str], rows: Optional[np.ndarray], top_k: int) -> List[Dict[str, Any]]:
+        """
+        The top_k companies whose quote, details or notes contain every quoted phrase.
+
+        Each phrase is matched exactly, or failing that by proximity (all its
+        words close together), so slightly misquoted passages still match.
+        Companies matching every phrase exactly rank first (score 1.0), then
+        those matching some only by proximity (score 0.5); within each, more
+        matches rank higher and ties keep dataset (rank) order.
+        """
+        allowed = None if rows is None else set(rows.tolist())
+
+        def by_row(matches):
+            found = {}
+            for match in matches:
+                row = match.pop('row')
+                if allowed is None or row in allowed:
+                    found.setdefault(row, []).append(match)
+            return found
+
+        matched = None  # row -> (phrases matched only by proximity, matches)
+        for phrase in phrases:
+            found = {row: (0, matches) for row, matches in by_row(self.phrase_index.phrase(phrase)).items()}
+            for row, matches in by_row(self.phrase_index.near(phrase)).items():
+                found.setdefault(row, (1, matches))
+            if matched is None:
+                matched = found
+            else:
+                matched = {row: (matched[row][0] + found[row][0], matched[row][1] + found[row][1])
+                           for row in matched if row in found}
+
+        ranked = sorted((matched or {}).items(), key=lambda item: (item[1][0], -len(item[1][1]), item[0]))
+        return [{'company': self.companies[row], 'score': 1.0 if proximity == 0 else 0.5, 'matches': matches}
+                for row, (proximity, matches) in ranked[:top_k]]
+
+    def _search(self, query: str, top_k: int, rows: Optional[np.ndarray]) -> List[Dict[str, Any]]:
+        """Uncached search over the given candidate rows (None = all)."""
+        # Exact entity fast path for named companies (aliases may be outside the vocabulary,
+        # so the raw query is tried before the spell-corrected one)
+        typed = query
+        with span('search.entities'):
+            named = self.entity_matcher.find(query)
+        if not named:
+            # Quoted passages are looked up verbatim in the phrase index
+            phrases = quoted_phrases(query)
+            if phrases:
+                with span('search.phrases'):
+                    results = self._phrase_search(phrases, rows, top_k)
+                if results:
+                    return results
+            with span('search.entities'):
+                query = self.correct_query(query)
+                named = self.entity_matcher.find(query)
+        if named:
+            if rows is not None:
+                allowed = set(rows.tolist())
+                named = [row for row in named if row in allowed]
+            return [{'company': self.companies[row], 'score': 1.0} for row in named]
+
+        # Structured constraints narrow the candidate set before any scoring. They are read
+        # from the question as typed, so a spelling correction cannot add or drop a filter.
+        negated = set()
+        with span('search.parse'):
+            filters = self.parse_query(typed, negated_terms=negated)
+            filter_rows = self.resolve_filters(filters)
+        if filter_rows is not None:
+            narrowed = filter_rows if rows is None else np.intersect1d(rows, filter_rows)
+            if len(narrowed):
+                rows = narrowed
+            else:
+                # Filters that no company meets together are likely misread; rank by text instead
+                filters = {}
+
+        if rows is not None and len(rows) == 0:
+            return []
+
+        score_start = time.perf_counter()
+        dense_vec = None
+        if self.scorer != 'tfidf':
+            dense_vec = self.embedder.embed(query)
+            # On large corpora the ANN index proposes candidates instead of a full scan
+            if rows is None and self.ann_index is not None:
+                rows = np.sort(self.ann_index.probe(dense_vec))
+
+        full_scan = rows is None
+        if full_scan:
+            rows = np.arange(len(self.companies))
+
+        similarities = np.zeros(len(rows))
+
+        if self.scorer != 'dense':
+            # Tokenize query; negated constraints ("aren't hybrid") must not pull in what they exclude
+            tokens = [token for token in self._tokenize(query) if token not in negated]
+
+            # Create query vector
+            vocab_size = len(self.vocabulary)
+            query_vec = np.zeros(vocab_size, dtype=np.float32)
+            for token in tokens:
+                if token in self.vocabulary:
+                    query_vec[self.vocabulary[token]] = 1
+
+            # Normalize
+            norm = np.linalg.norm(query_vec)
+            if norm > 0:
+                query_vec = query_vec / norm
+
+            # Calculate similarities (only for the candidate rows when filtered)
+            matrix = self.tfidf_matrix if full_scan else self.tfidf_matrix[rows]
+            weight = 1.0 if self.scorer == 'tfidf' else 1.0 - self.dense_weight
+            similarities += weight * np.dot(matrix, query_vec)
+
+        if dense_vec is not None:
+            matrix = self.dense_matrix if full_scan else self.dense_matrix[rows]
+            weight = 1.0 if self.scorer == 'dense' else self.dense_weight
+            similarities += weight * np.dot(matrix, dense_vec)
+
+        # Get top results; a stable sort keeps ties in dataset (rank) order
+        top_positions = np.argsort(-similarities, kind='stable')[:top_k]
+        record('search.score', time.perf_counter() - score_start)
 
         results = []
-        for idx in top_indices:
-            if similarities[idx] > 0:
+        for pos in top_positions:
+            # Rows matched by structured filters are relevant even without text overlap
+            if similarities[pos] > 0 or filters:
                 results.append({
-                    'company': self.companies[idx],
-                    'score': float(similarities[idx])
+                    'company': self.companies[rows[pos]],
+                    'score': float(similarities[pos])
                 })
 
         return results
 
 
-def format_company_context(companies: List[Dict[str, Any]]) -> str:
-    """Format company data as context for the LLM."""
-    context_parts = []
+# Field values that carry no information for the model
+PLACEHOLDER_VALUES = {'', 'unknown', 'n/a', 'na', 'none', 'not specified', 'no details available',
+                      'no quote available', 'tbd'}
 
-    for result in companies:
-        company = result['company']
-        wp = company.get('work_policy', {})
-        innovation = company.get('innovation', {})
+# Separates company blocks in the packed context
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+_TOKEN_ESTIMATE_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough local estimate of the model's token count.
+
+    Words count one token per started four characters, each punctuation
+    mark one token; this tracks BPE tokenizers closely enough for budgeting.
+    """
+    return sum((len(piece) + 3) // 4 if piece[0].isalnum() or piece[0] == '_' else 1
+               for piece in _TOKEN_ESTIMATE_PATTERN.findall(text))
 
-        context = f"""
-Company: {company.get('company', 'Unknown')}
-Sector: {company.get('sector', 'Unknown')}
-Industry: {company.get('industry_sector', 'Unknown')}
-Headquarters: {company.get('headquarters', 'Unknown')}
-Employees: {company.get('employee_count', 'Unknown'):,}
-Innovation Rank: #{innovation.get('overall_rank', 'N/A')}
-
-Work Policy:
-- Type: {wp.get('type', 'Unknown')}
-- Category: {wp.get('category', 'Unknown')}
-- Days in Office: {wp.get('days_required', 'Unknown')}
-- Trend: {wp.get('trend_direction', 'Unknown')}
-- Effective Date: {wp.get('effective_date', 'Unknown')}
-- Details: {wp.get('details', 'No details available')}
-
-Key Quote: "{company.get('key_quote', 'No quote available')}"
-"""
-        context_parts.append(context.strip())
 
-    return "\n\n---\n\n".join(context_parts)
+def _is_placeholder(value: Any) -> bool:
+    if value is None:
+        return True
+    return str(value).strip().lower() in PLACEHOLDER_VALUES
+
+
+def truncate_to_tokens(text: str, max_tokens: Optional[int]) -> str:
+    """Cut text at a word boundary so it fits max_tokens (estimated), marking the cut with '…'."""
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    kept = []
+    used = 1  # the ellipsis
+    for word in words:
+        used += estimate_tokens(word)
+        if used > max_tokens:
+            break
+        kept.append(word)
+    return ' '.join(kept).rstrip(',;:.') + '…'
+
+
+def _employee_count(value: Any) -> Optional[float]:
+    """Employee count as a number, or None for placeholders like 'Unknown'."""
+    if isinstance(value, str):
+        try:
+            value = float(value.replace(',', '').strip())
+        except ValueError:
+            return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0:
+        return None
+    return value
+
+
+def _company_block(company: Dict[str, Any], max_field_tokens: Optional[int]) -> str:
+    """Compact description of one company, without placeholder fields."""
+    wp = company.get('work_policy', {})
+    innovation = company.get('innovation', {})
+
+    header = [f"Company: {company.get('company', 'Unknown')}"]
+    if not _is_placeholder(innovation.get('overall_rank')):
+        header.append(f"Innovation Rank #{innovation['overall_rank']}")
+    for label, value in (('Sector', company.get('sector')),
+                         ('Industry', company.get('industry_sector')),
+                         ('HQ', company.get('headquarters'))):
+        if not _is_placeholder(value) and not (label == 'Industry' and value == company.get('sector')):
+            header.append(f"{label}: {value}")
+    employees = _employee_count(company.get('employee_count'))
+    if employees is not None:
+        header.append(f"Employees: {employees:,.0f}")
+
+    policy = []
+    for label, value in (('Type', wp.get('type')),
+                         ('Category', wp.get('category')),
+                         ('Days in Office', wp.get('days_required')),
+                         ('Trend', wp.get('trend_direction')),
+                         ('Effective', wp.get('effective_date'))):
+        if not _is_placeholder(value):
+            policy.append(f"{label}: {value}")
+
+    lines = [' | '.join(header)]
+    if policy:
+        lines.append('Work Policy: ' + ' | '.join(policy))
+    if not _is_placeholder(wp.get('details')):
+        lines.append(f"Details: {truncate_to_tokens(wp['details'], max_field_tokens)}")
+    if not _is_placeholder(company.get('key_quote')):
+        lines.append(f'Key Quote: "{truncate_to_tokens(company["key_quote"], max_field_tokens)}"')
+    return '\n'.join(lines)
+
+
+class ContextFragments:
+    """
+    Rendered context blocks per company, reused across turns.
+
+    Blocks are keyed by company name and carry a fingerprint of the
+    record they were rendered from; sync() re-renders only the companies
+    whose record changed and drops those no longer in the dataset.
+    """
+
+    def __init__(self, max_field_tokens: Optional[int] = 60):
+        self.max_field_tokens = max_field_tokens
+        self._fragments: Dict[str, tuple] = {}  # name -> (fingerprint, block, tokens)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(company: Dict[str, Any]) -> str:
+        payload = json.dumps(company, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(payload).hexdigest()
+
+    def _render(self, company: Dict[str, Any], fingerprint: str) -> tuple:
+        block = _company_block(company, self.max_field_tokens)
+        return fingerprint, block, estimate_tokens(block)
+
+    def sync(self, companies: List[Dict[str, Any]]) -> int:
+        """Bring the fragments in line with companies; returns the number (re-)rendered."""
+        fragments = {}
+        rendered = 0
+        with self._lock:
+            for company in companies:
+                name = company.get('company', 'Unknown')
+                fingerprint = self._fingerprint(company)
+                cached = self._fragments.get(name)
+                if cached is None or cached[0] != fingerprint:
+                    cached = self._render(company, fingerprint)
+                    rendered += 1
+                fragments[name] = cached
+            self._fragments = fragments
+        return rendered
+
+    def get(self, company: Dict[str, Any]) -> tuple:
+        """(block, estimated tokens) for a company, rendering it if it was not synced."""
+        name = company.get('company', 'Unknown')
+        cached = self._fragments.get(name)
+        if cached is None:
+            cached = self._render(company, self._fingerprint(company))
+            with self._lock:
+                self._fragments[name] = cached
+        return cached[1], cached[2]
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+
+def format_company_context(companies: List[Dict[str, Any]], token_budget: Optional[int] = 900,
+                           max_field_tokens: Optional[int] = 60, min_score_ratio: float = 0.4,
+                           fragments: Optional[ContextFragments] = None) -> str:
+    """
+    Pack search results into LLM context within a token budget.
+
+    Results are added in score order. Those scoring below min_score_ratio
+    times the top score are left out, and packing stops at the first
+    result that would exceed token_budget (the top result is always
+    included). Placeholder fields are dropped and long text fields
+    truncated to max_field_tokens. Pass None to disable either limit.
+
+    With fragments (the engine's context_fragments), each company's block
+    is taken pre-rendered instead of being formatted for every turn; its
+    max_field_tokens then applies.
+    """
+    results = sorted(companies, key=lambda r: -r.get('score', 0))
+    top_score = results[0].get('score', 0) if results else 0
+
+    context_parts = []
+    used = 0
+    for result in results:
+        if top_score > 0 and result.get('score', 0) < min_score_ratio * top_score:
+            break
+        if fragments is not None:
+            block, cost = fragments.get(result['company'])
+        else:
+            block = _company_block(result['company'], max_field_tokens)
+            cost = estimate_tokens(block)
+        # Matched snippets are kept verbatim so they can be cited exactly
+        for match in result.get('matches', []):
+            line = f'Matched {match["field"]} text: "{match["text"]}"'
+            block += '\n' + line
+            cost += estimate_tokens(line)
+        cost += estimate_tokens(CONTEXT_SEPARATOR) if context_parts else 0
+        if context_parts and token_budget is not None and used + cost > token_budget:
+            break
+        context_parts.append(block)
+        used += cost
+
+    return CONTEXT_SEPARATOR.join(context_parts)
 
 
 def create_system_prompt() -> str:
@@ -204,6 +1129,87 @@ You have access to data on work policies including:
 Always base your answers on the provided company context. If the context doesn't contain relevant information, say so."""
 
 
+def build_dataset_digest(companies: List[Dict[str, Any]]) -> str:
+    """
+    Dataset-wide facts for the cached prompt prefix.
+
+    Category, trend and days-required counts, plus average required days
+    per sector. Hybrid policies listed with 0 days have no fixed day count
+    and are left out of the averages.
+    """
+    categories = Counter()
+    trends = Counter()
+    days_counts = Counter()
+    sector_days = {}
+    for company in companies:
+        wp = company.get('work_policy', {})
+        category = wp.get('category') or 'Unknown'
+        categories[category] += 1
+        trends[wp.get('trend_direction') or 'Unknown'] += 1
+        try:
+            days = int(wp.get('days_required', 0) or 0)
+        except (ValueError, TypeError):
+            continue
+        if days == 0 and category != 'Fully Remote':
+            days_counts['no fixed number'] += 1
+            continue
+        days_counts[f"{days} days"] += 1
+        sector_days.setdefault(company.get('sector') or 'Unknown', []).append(days)
+
+    def counts(counter: Counter) -> str:
+        return ', '.join(f"{value}: {n}" for value, n in counter.most_common())
+
+    all_days = [d for days in sector_days.values() for d in days]
+    sectors = sorted(sector_days.items(), key=lambda item: (-len(item[1]), item[0]))
+    lines = [
+        f"DATASET OVERVIEW (all {len(companies)} companies in the research platform, "
+        "not only those retrieved for a question):",
+        f"- Policy categories: {counts(categories)}",
+        f"- Trend direction: {counts(trends)}",
+        f"- Days in office required: {counts(days_counts)}",
+    ]
+    if all_days:
+        lines.append(f"- Average required days (companies with a fixed requirement): "
+                     f"{sum(all_days) / len(all_days):.1f}")
+        lines.append("- Average required days by sector: " + '; '.join(
+            f"{sector} {sum(days) / len(days):.1f} (n={len(days)})" for sector, days in sectors
+        ))
+    return '\n'.join(lines)
+
+
+# Shortest prefix, in tokens, the provider caches for each model family; shorter prefixes
+# are billed as plain input and cache_control has no effect
+PROMPT_CACHE_MIN_TOKENS = {'haiku': 2048, 'sonnet': 1024, 'opus': 1024}
+
+
+def prompt_cache_min_tokens(model: str) -> int:
+    """The provider's minimum cacheable prefix length for model (the larger one if unknown)."""
+    for family, minimum in PROMPT_CACHE_MIN_TOKENS.items():
+        if family in model:
+            return minimum
+    return max(PROMPT_CACHE_MIN_TOKENS.values())
+
+
+def create_system_blocks(dataset_digest: str) -> List[Dict[str, Any]]:
+    """
+    System prompt and dataset digest as content blocks.
+
+    Both are identical for every call on the same dataset, so the last
+    block is marked for provider-side prompt caching; only the retrieved
+    companies and the question (in the user message) vary.
+
+    Note: on the current dataset the two blocks come to about 700
+    estimated tokens, below PROMPT_CACHE_MIN_TOKENS for every model the
+    router uses, so the marker is a no-op and no cache reads happen yet.
+    It starts paying off once the prefix grows past the minimum (see
+    python -m utils.benchmark_prompt_cache).
+    """
+    return [
+        {'type': 'text', 'text': create_system_prompt()},
+        {'type': 'text', 'text': dataset_digest, 'cache_control': {'type': 'ephemeral'}},
+    ]
+
+
 def generate_response_prompt(query: str, context: str) -> str:
     """Generate the user prompt with context."""
     return f"""Based on the following company data, please answer the user's question.
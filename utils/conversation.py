@@ -0,0 +1,111 @@
+"""
+Bounded multi-turn memory for the Research Assistant.
+
+The most recent turns are sent to the model verbatim (answers truncated
+to a per-turn cap); older turns are folded into a rolling summary of
+one short line each, and the oldest summary lines are dropped once the
+summary exceeds its token cap. Memory per session is therefore bounded
+no matter how long the conversation runs.
+
+Follow-up questions that refer back ("and what about their trend?") are
+resolved against the companies discussed in the previous turn, so
+retrieval finds the right companies.
+"""
+
+import hashlib
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from utils.chatbot import estimate_tokens, truncate_to_tokens
+
+# Wording that refers back to the previous turn's companies. Not "it"/"its", which
+# new questions use freely ("made it mandatory").
+_FOLLOW_UP_PATTERN = re.compile(
+    r'^\s*(?:and|also|what about|how about|same for)\b'
+    r'|\b(?:they|them|their|theirs|that company|those companies|these companies)\b',
+    re.IGNORECASE
+)
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+    companies: List[str] = field(default_factory=list)
+
+
+class ConversationMemory:
+    """Recent turns verbatim plus a token-capped rolling summary of older ones."""
+
+    def __init__(self, recent_turns: int = 3, turn_token_cap: int = 250, summary_token_cap: int = 300):
+        """
+        Args:
+            recent_turns: Question/answer pairs sent verbatim
+            turn_token_cap: Estimated tokens kept per recent answer
+            summary_token_cap: Estimated tokens the rolling summary may use
+        """
+        self.recent_turns = recent_turns
+        self.turn_token_cap = turn_token_cap
+        self.summary_token_cap = summary_token_cap
+        self.recent = deque()
+        self.summary_lines = deque()
+        self.last_companies: List[str] = []
+
+    def add_turn(self, question: str, answer: str, companies: List[str]):
+        """Record a finished turn; turns leaving the recent window are summarized."""
+        self.recent.append(Turn(question, truncate_to_tokens(answer, self.turn_token_cap), list(companies)))
+        # Follow-ups refer to the latest turn only, even when it named no companies
+        self.last_companies = list(companies)
+        while len(self.recent) > self.recent_turns:
+            self._summarize(self.recent.popleft())
+
+    def _summarize(self, turn: Turn):
+        # First sentence of the answer, without markdown emphasis
+        answer = re.sub(r'[*_#`]', '', turn.answer).strip()
+        first_sentence = re.split(r'(?<=[.!?])\s', answer, maxsplit=1)[0]
+        line = f"- Q: {truncate_to_tokens(turn.question, 30)} A: {truncate_to_tokens(first_sentence, 40)}"
+        if turn.companies:
+            line += f" (companies: {', '.join(turn.companies[:5])})"
+        self.summary_lines.append(line)
+        while len(self.summary_lines) > 1 and estimate_tokens(self.summary) > self.summary_token_cap:
+            self.summary_lines.popleft()
+
+    @property
+    def summary(self) -> str:
+        return '\n'.join(self.summary_lines)
+
+    def resolve_query(self, query: str, names_company: bool, has_filters: bool = False) -> str:
+        """
+        Add the previous turn's companies to a follow-up question that names none.
+
+        Used for retrieval and aggregate detection only; the model still
+        sees the question as asked. Questions with their own structured
+        filters (has_filters) select their own companies and are left as is.
+        """
+        if (names_company or has_filters or not self.last_companies
+                or not _FOLLOW_UP_PATTERN.search(query)):
+            return query
+        return f"{query} ({', '.join(self.last_companies)})"
+
+    def messages(self, prompt: str) -> List[Dict[str, Any]]:
+        """Recent turns verbatim, then the new prompt prefixed with the summary of older turns."""
+        messages = []
+        for turn in self.recent:
+            messages.append({"role": "user", "content": turn.question})
+            messages.append({"role": "assistant", "content": turn.answer})
+        if self.summary_lines:
+            prompt = f"EARLIER IN THIS CONVERSATION (summary):\n{self.summary}\n\n{prompt}"
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def digest(self) -> str:
+        """Hash of everything sent to the model besides the new prompt (for response caching)."""
+        payload = self.summary + ''.join(f"\0{t.question}\0{t.answer}" for t in self.recent)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest() if payload else ''
+
+    def clear(self):
+        self.recent.clear()
+        self.summary_lines.clear()
+        self.last_companies = []
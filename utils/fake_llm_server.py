@@ -0,0 +1,189 @@
+"""
+Offline stand-in for the Anthropic messages endpoint.
+
+Serves POST /v1/messages with the same server-sent events as the real
+API (message_start, content_block_delta, ..., message_stop), so the
+SDK's streaming client works unchanged. Latency and failures are
+configurable: a delay before the first token, a steady token rate, a
+share of requests answered with 429 (rate limit) or 529 (overloaded),
+and a requests-per-minute limit above which requests get 429 like an
+API account's rate limit.
+
+Point the assistant at it with ANTHROPIC_BASE_URL:
+    python -m utils.fake_llm_server --port 8765 --token-rate 60 --error-rate 0.05
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from utils.rate_limit import TokenBucket
+
+ANSWER_WORDS = (
+    "Based on the company data, the policy requires employees in the office on set days each week. "
+    "Leadership describes in-person time as important for collaboration, mentoring and culture, "
+    "while teams keep some flexibility for focused remote work. The trend has been toward more "
+    "structured attendance since the original return-to-office announcement."
+).split()
+
+
+@dataclass
+class FakeServerConfig:
+    first_token_delay: float = 0.4   # Seconds before the first text delta
+    token_rate: float = 50.0         # Output tokens (words) per second
+    answer_tokens: int = 150         # Answer length, capped by the request's max_tokens
+    error_rate: float = 0.0          # Share of requests that fail before streaming
+    error_status: int = 429          # 429 rate limit or 529 overloaded
+    retry_after: float = 0.2         # Retry-After header sent with errors
+    requests_per_minute: float = 0.0 # Server-side rate limit, one second's worth of burst (0: none)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    config = FakeServerConfig()
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get('content-length', 0)))
+        if not self.path.startswith('/v1/messages'):
+            self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+            return
+
+        config = self.config
+        if random.random() < config.error_rate:
+            kind = 'overloaded_error' if config.error_status == 529 else 'rate_limit_error'
+            self._send_json(config.error_status, {'type': 'error', 'error': {'type': kind, 'message': 'Injected'}},
+                            {'retry-after': str(config.retry_after)})
+            return
+        if not self.server.admit():
+            self._send_json(429, {'type': 'error', 'error': {'type': 'rate_limit_error',
+                                                             'message': 'Requests per minute exceeded'}},
+                            {'retry-after': str(config.retry_after)})
+            return
+
+        request = json.loads(raw or b'{}')
+        n_tokens = min(config.answer_tokens, int(request.get('max_tokens', config.answer_tokens)))
+        words = [ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(n_tokens)]
+        # Roughly four bytes per input token
+        usage = {'input_tokens': max(1, len(raw) // 4), 'output_tokens': 0,
+                 'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        message = {'id': f"msg_fake_{random.getrandbits(48):012x}", 'type': 'message', 'role': 'assistant',
+                   'model': request.get('model', 'fake'), 'content': [], 'stop_reason': None,
+                   'stop_sequence': None, 'usage': usage}
+
+        if not request.get('stream'):
+            time.sleep(config.first_token_delay + n_tokens / config.token_rate)
+            message.update(content=[{'type': 'text', 'text': ' '.join(words)}], stop_reason='end_turn',
+                           usage=dict(usage, output_tokens=n_tokens))
+            self._send_json(200, message)
+            return
+
+        self.send_response(200)
+        self.send_header('content-type', 'text/event-stream')
+        self.send_header('cache-control', 'no-cache')
+        self.send_header('connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        self.wfile.write(_sse('message_start', {'type': 'message_start', 'message': message}))
+        self.wfile.write(_sse('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                                      'content_block': {'type': 'text', 'text': ''}}))
+        self.wfile.flush()
+        time.sleep(config.first_token_delay)
+
+        interval = 1.0 / config.token_rate
+        next_at = time.perf_counter()
+        for i, word in enumerate(words):
+            text = word if i == 0 else ' ' + word
+            self.wfile.write(_sse('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                          'delta': {'type': 'text_delta', 'text': text}}))
+            self.wfile.flush()
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+
+        self.wfile.write(_sse('content_block_stop', {'type': 'content_block_stop', 'index': 0}))
+        self.wfile.write(_sse('message_delta', {'type': 'message_delta',
+                                                'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                                'usage': {'output_tokens': n_tokens}}))
+        self.wfile.write(_sse('message_stop', {'type': 'message_stop'}))
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    bucket: Optional[TokenBucket] = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._bucket_lock = threading.Lock()
+
+    def admit(self) -> bool:
+        """Whether a request fits the configured rate limit."""
+        if self.bucket is None:
+            return True
+        with self._bucket_lock:
+            return self.bucket.try_take()
+
+
+def make_server(config: FakeServerConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Create (not start) a threaded server; port 0 picks a free port (see server.server_address)."""
+    handler = type('FakeMessagesHandler', (_Handler,), {'config': config})
+    server = _Server((host, port), handler)
+    server.daemon_threads = True
+    if config.requests_per_minute:
+        server.bucket = TokenBucket(config.requests_per_minute / 60)
+    return server
+
+
+def start_in_thread(config: FakeServerConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start a server on a background thread and return it (call shutdown() to stop)."""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-delay', type=float, default=FakeServerConfig.first_token_delay)
+    parser.add_argument('--token-rate', type=float, default=FakeServerConfig.token_rate)
+    parser.add_argument('--answer-tokens', type=int, default=FakeServerConfig.answer_tokens)
+    parser.add_argument('--error-rate', type=float, default=FakeServerConfig.error_rate)
+    parser.add_argument('--error-status', type=int, choices=(429, 529), default=FakeServerConfig.error_status)
+    parser.add_argument('--requests-per-minute', type=float, default=FakeServerConfig.requests_per_minute)
+    args = parser.parse_args()
+
+    config = FakeServerConfig(args.first_token_delay, args.token_rate, args.answer_tokens,
+                              args.error_rate, args.error_status, requests_per_minute=args.requests_per_minute)
+    server = make_server(config, args.host, args.port)
+    print(f"Fake messages API on http://{args.host}:{server.server_address[1]} ({config})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
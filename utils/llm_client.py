@@ -0,0 +1,173 @@
+"""
+Shared Anthropic client for the Research Assistant.
+
+One AssistantClient is created per process and reused by every session,
+so HTTP connections stay pooled instead of being set up on every turn.
+Calls go through a FairLimiter (utils.rate_limit): a process-wide cap on
+concurrent calls and, optionally, on requests per minute, with waiting
+calls served round-robin per session. Callers that cannot be admitted in
+time get AssistantBusyError instead of piling up. Rate-limit, overload
+and connection errors are retried with jittered exponential backoff
+(honouring Retry-After) as long as no text has been streamed yet.
+
+The client talks to ANTHROPIC_BASE_URL when it is set, so it can be
+pointed at a local fake server that injects latency and 429s.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Union
+
+import anthropic
+
+from utils.rate_limit import FairLimiter, Ticket
+from utils.telemetry import annotate, span
+
+# HTTP statuses worth retrying: timeouts, rate limits, server errors and overload
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class AssistantBusyError(RuntimeError):
+    """The call was not admitted (no free slot or rate budget) within the queue timeout."""
+
+
+class AssistantClient:
+    """Process-wide Anthropic client with bounded concurrency, retries and timeouts."""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, max_concurrent: int = 4,
+                 queue_timeout: float = 30.0, timeout: float = 60.0, max_attempts: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 requests_per_minute: Optional[float] = None, burst: Optional[float] = None):
+        """
+        Args:
+            api_key: Anthropic API key
+            base_url: API endpoint (defaults to ANTHROPIC_BASE_URL or the public API)
+            max_concurrent: Model calls allowed in flight at once, across all sessions
+            queue_timeout: Seconds to wait for admission before raising AssistantBusyError
+            timeout: Per-call timeout in seconds
+            max_attempts: Attempts per call, including the first
+            backoff_base: First backoff ceiling in seconds (doubles per retry)
+            backoff_max: Upper bound for a single backoff
+            requests_per_minute: Sustained request rate across all sessions, retries included
+                (None for no rate limit)
+            burst: Requests that may start at once after an idle period
+        """
+        # Retries are done here so they can respect the semaphore and the streaming state
+        self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = FairLimiter(max_concurrent, requests_per_minute / 60 if requests_per_minute else None, burst)
+        self._lock = threading.Lock()
+        self._counters = {
+            'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'in_flight': 0,
+            # Token usage summed over completed calls
+            'input_tokens': 0, 'output_tokens': 0,
+            'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0,
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        if isinstance(error, anthropic.APIStatusError):
+            return error.status_code in RETRYABLE_STATUSES
+        # Connection failures and timeouts
+        return isinstance(error, anthropic.APIConnectionError)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before the next attempt: Retry-After if given, else full jitter."""
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record_usage(self, usage: Any):
+        tokens = {name: getattr(usage, name, 0) or 0
+                  for name in ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')}
+        with self._lock:
+            for name, count in tokens.items():
+                self._counters[name] += count
+        annotate(**tokens)
+
+    def enqueue(self, session: Optional[Hashable] = None) -> Ticket:
+        """
+        Queue a call for session ahead of stream_text(ticket=...).
+
+        Lets the caller show the ticket's queue position while the call
+        itself waits for admission on another thread.
+        """
+        return self.limiter.enqueue(session)
+
+    def stream_text(self, *, model: str, max_tokens: int, system: Union[str, List[Dict[str, Any]]],
+                    messages: List[Dict[str, Any]], timeout: Optional[float] = None,
+                    ticket: Optional[Ticket] = None) -> Iterator[str]:
+        """
+        Stream the answer text, holding one concurrency slot for the whole call.
+
+        Uses ticket from enqueue() if given, else queues the call on its
+        own. Raises AssistantBusyError if it is not admitted within
+        queue_timeout. Errors after the first text chunk are not retried,
+        since part of the answer has already been shown.
+        """
+        if ticket is None:
+            ticket = self.limiter.enqueue()
+        with span('llm.acquire_slot'):
+            admitted = self.limiter.wait(ticket, self.queue_timeout)
+        if not admitted:
+            self._count('rejected')
+            raise AssistantBusyError("The assistant is at capacity; please try again shortly.")
+
+        self._count('calls')
+        self._count('in_flight')
+        try:
+            for attempt in range(self.max_attempts):
+                started = False
+                try:
+                    with self.client.messages.stream(
+                        model=model,
+                        max_tokens=max_tokens,
+                        system=system,
+                        messages=messages,
+                        timeout=timeout or self.timeout,
+                    ) as stream:
+                        for text in stream.text_stream:
+                            started = True
+                            yield text
+                        self._record_usage(stream.get_final_message().usage)
+                    return
+                except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+                    if started or not self._retryable(e) or attempt + 1 >= self.max_attempts:
+                        self._count('failures')
+                        raise
+                    self._count('retries')
+                    with span('llm.retry_backoff'):
+                        time.sleep(self._backoff(attempt, e))
+                        # Retries count against the request rate too
+                        if not self.limiter.take_token(self.queue_timeout):
+                            self._count('failures')
+                            raise
+        finally:
+            self._count('in_flight', -1)
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counters and token usage, with the share of input tokens served from the prompt cache."""
+        with self._lock:
+            stats = dict(self._counters)
+        prompt_tokens = (stats['input_tokens'] + stats['cache_creation_input_tokens']
+                         + stats['cache_read_input_tokens'])
+        stats['cache_read_ratio'] = stats['cache_read_input_tokens'] / prompt_tokens if prompt_tokens else 0.0
+        limiter = self.limiter.stats()
+        stats['queued'] = limiter['queued']
+        stats['mean_wait_seconds'] = limiter['mean_wait_seconds']
+        return stats
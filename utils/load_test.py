@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Load test for the Research Assistant against the offline LLM stand-in.
+
+Simulated users run concurrently, each with its own conversation memory,
+and share one set of AssistantServices (search engine, aggregates, model
+router, response cache and pooled AssistantClient), as Streamlit
+sessions in one process do. Every turn goes through handle_turn(), the
+chat handler app.py uses, with the headless TurnUI. The response cache
+starts empty unless --response-cache points at an existing one. The
+fake server runs in its own process so its work does not compete with
+the measured one.
+
+Run from the repository root:
+    python -m utils.load_test --users 20 --turns 5 --token-rate 50
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils.aggregates import AggregateEngine
+from utils.benchmark_search import load_companies
+from utils.chat_turn import AssistantServices, TurnOutcome, handle_turn
+from utils.chatbot import CompanySearchEngine
+from utils.conversation import ConversationMemory
+from utils.fake_llm_server import FakeServerConfig, make_server
+from utils.llm_client import AssistantClient
+from utils.model_router import ModelRouter
+from utils.response_cache import ResponseCache
+from utils.telemetry import trace
+
+QUESTIONS = [
+    "What is Apple's policy?",
+    "Compare Google and Microsoft",
+    "Who's tightening RTO?",
+    "Which tech companies are fully remote?",
+    "What do executives say about collaboration and innovation?",
+    "Companies with badge tracking",
+    "Hybrid policies in healthcare",
+    "How many companies require 5 days in office?",
+    "What is Nvidia's approach to remote work?",
+    "Why are banks bringing people back to the office?",
+]
+
+FOLLOW_UPS = [
+    "And what about their trend?",
+    "How many days do they require?",
+    "What did their leadership say about it?",
+]
+
+
+def _rss_mb() -> float:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _serve(config: FakeServerConfig, port_queue):
+    server = make_server(config)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_fake_server(config: FakeServerConfig):
+    """Run the fake messages API in a child process; returns (process, base_url)."""
+    ctx = multiprocessing.get_context('spawn')
+    port_queue = ctx.Queue()
+    process = ctx.Process(target=_serve, args=(config, port_queue), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+
+class AssistantStack:
+    """The process-wide objects app.py keeps in st.cache_resource."""
+
+    def __init__(self, base_url: str, max_concurrent: int, queue_timeout: float,
+                 requests_per_minute: Optional[float] = None, burst: Optional[float] = None,
+                 response_cache_path: Optional[str] = None):
+        engine = CompanySearchEngine(load_companies())
+        self._cache_dir = None
+        if response_cache_path is None:
+            self._cache_dir = tempfile.TemporaryDirectory()
+            response_cache_path = os.path.join(self._cache_dir.name, 'responses.sqlite')
+        self.client = AssistantClient('load-test', base_url=base_url, max_concurrent=max_concurrent,
+                                      queue_timeout=queue_timeout, requests_per_minute=requests_per_minute,
+                                      burst=burst)
+        self.services = AssistantServices(engine, AggregateEngine(engine), ModelRouter(),
+                                          ResponseCache(response_cache_path), self.client)
+
+    def run_turn(self, memory: ConversationMemory, question: str, session: Optional[str] = None) -> TurnOutcome:
+        """One chat turn through app.py's handler, without the UI."""
+        return handle_turn(self.services, memory, question, session=session)
+
+
+def simulated_user(stack: AssistantStack, user_id: int, turns: int, think_time: float,
+                   records: List[Dict[str, Any]], lock: threading.Lock):
+    rng = random.Random(user_id)
+    memory = ConversationMemory()
+    for turn in range(turns):
+        question = rng.choice(FOLLOW_UPS) if turn and rng.random() < 0.3 else rng.choice(QUESTIONS)
+        error = None
+        with trace('assistant_turn') as t:
+            try:
+                error = stack.run_turn(memory, question, session=f"user-{user_id}").error
+            except Exception as e:
+                error = type(e).__name__
+        record = t.to_dict()
+        record['error'] = error
+        record['user'] = user_id
+        with lock:
+            records.append(record)
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+
+
+def _percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:8.1f}  p95 {p95:8.1f}  p99 {p99:8.1f}"
+
+
+def run(users: int, turns: int, think_time: float, max_concurrent: int, queue_timeout: float,
+        server_config: FakeServerConfig, base_url: Optional[str] = None,
+        requests_per_minute: Optional[float] = None, burst: Optional[float] = None,
+        response_cache_path: Optional[str] = None):
+    process = None
+    if base_url is None:
+        process, base_url = start_fake_server(server_config)
+
+    rss_start = _rss_mb()
+    stack = AssistantStack(base_url, max_concurrent, queue_timeout, requests_per_minute, burst, response_cache_path)
+    rss_ready = _rss_mb()
+
+    records: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    threads = [threading.Thread(target=simulated_user, args=(stack, i, turns, think_time, records, lock))
+               for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    rss_end = _rss_mb()
+
+    if process is not None:
+        process.terminate()
+
+    ok = [r for r in records if r['error'] is None]
+    errors = Counter(r['error'] for r in records if r['error'])
+    answers = Counter(r['attributes'].get('answer', 'none') for r in ok)
+
+    def spans(name: str) -> List[float]:
+        return [r['spans_ms'][name] for r in ok if name in r['spans_ms']]
+
+    limit = f", {requests_per_minute:g} requests/min" if requests_per_minute else ""
+    print(f"Load test: {users} users x {turns} turns, max {max_concurrent} concurrent model calls{limit}")
+    print(f"Fake server: {server_config}")
+    print("=" * 60)
+    print(f"Turns: {len(ok)} ok, {sum(errors.values())} failed {dict(errors) or ''}, "
+          f"{len({r['user'] for r in records if r['error']})} of {users} users saw an error")
+    print(f"Answers: {dict(answers)}")
+    print(f"Throughput: {len(ok) / elapsed:.2f} turns/s over {elapsed:.1f}s")
+    print(f"Turn latency (ms)          {_percentiles(spans('total'))}")
+    print(f"Time to first token (ms)   {_percentiles(spans('llm.time_to_first_token'))}")
+    print(f"Wait for model slot (ms)   {_percentiles(spans('llm.acquire_slot'))}")
+    print(f"Search (ms)                {_percentiles(spans('search'))}")
+    print(f"Retries: {stack.client.stats()['retries']}, rejected: {stack.client.stats()['rejected']}")
+    cache_hits = sum(1 for r in ok if r['attributes'].get('response_cache_hit'))
+    print(f"Response cache hits: {cache_hits} of {sum(1 for r in ok if 'response_cache_hit' in r['attributes'])} "
+          f"model answers")
+    print(f"RSS: {rss_start:.0f} MB at start, {rss_ready:.0f} MB with indexes loaded, {rss_end:.0f} MB after run "
+          f"(peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Research Assistant against a fake LLM server")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--turns', type=int, default=5)
+    parser.add_argument('--think-time', type=float, default=0.5, help="Mean seconds between a user's turns")
+    parser.add_argument('--max-concurrent', type=int, default=4, help="AssistantClient concurrency limit")
+    parser.add_argument('--queue-timeout', type=float, default=30.0)
+    parser.add_argument('--requests-per-minute', type=float, help="AssistantClient rate limit (default: none)")
+    parser.add_argument('--burst', type=float, help="AssistantClient rate limit burst")
+    parser.add_argument('--base-url', help="Use an already running server instead of starting one")
+    parser.add_argument('--response-cache', help="Response cache SQLite file (default: a new, empty one)")
+    parser.add_argument('--first-token-delay', type=float, default=FakeServerConfig.first_token_delay)
+    parser.add_argument('--token-rate', type=float, default=FakeServerConfig.token_rate)
+    parser.add_argument('--answer-tokens', type=int, default=FakeServerConfig.answer_tokens)
+    parser.add_argument('--error-rate', type=float, default=FakeServerConfig.error_rate)
+    parser.add_argument('--error-status', type=int, choices=(429, 529), default=FakeServerConfig.error_status)
+    parser.add_argument('--server-requests-per-minute', type=float, default=FakeServerConfig.requests_per_minute,
+                        help="Fake server's own rate limit, answered with 429")
+    args = parser.parse_args()
+
+    server_config = FakeServerConfig(args.first_token_delay, args.token_rate, args.answer_tokens,
+                                     args.error_rate, args.error_status,
+                                     requests_per_minute=args.server_requests_per_minute)
+    run(args.users, args.turns, args.think_time, args.max_concurrent, args.queue_timeout,
+        server_config, args.base_url, args.requests_per_minute, args.burst, args.response_cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,23 @@ Merge all research batch JSON files into a single consolidated dataset.
 Handles both old and new JSON formats.
 """
 
+import hashlib
+import io
 import json
 import os
 import re
+import sqlite3
+from contextlib import contextmanager, redirect_stdout
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+try:
+    from utils.parallel import ordered_pool_map
+except ImportError:  # Run as a script: python3 utils/merge_data.py
+    from parallel import ordered_pool_map
+
+# Bump when the manifest layout changes
+MANIFEST_VERSION = 1
 
 def extract_days_from_text(text: str) -> int:
     """Extract number of days from text like '3 days in office' or '4-day hybrid'."""
@@ -35,6 +47,94 @@ def extract_days_from_text(text: str) -> int:
 
     return 0
 
+# map_to_category keyword groups as (group, text searched, keywords). The text is the
+# policy type, the details, or both joined by a space ('combined'), all lowercased.
+CATEGORY_KEYWORDS = [
+    ('full_office', 'policy', ['5-day office', 'full-time office', 'five days']),
+    ('unknown', 'policy', ['unknown', 'unclear', 'unable to verify', 'no public data']),
+    ('role_dependent', 'combined', ['role-dependent', 'role dependent', 'position-dependent', 'position dependent',
+                                    'varies by role', 'varies by position', 'client-dependent', 'client dependent']),
+    ('limited_remote', 'policy', ['limited remote', 'partial remote', 'some remote']),
+    ('flexible', 'policy', ['flexible', 'hybrid', 'days in office', 'days per week']),
+    ('clinical', 'details', ['clinical']),
+    ('administrative', 'details', ['administrative']),
+    ('fully_remote', 'policy', ['remote-first', 'fully remote', 'fully-remote', 'permanent remote',
+                                'permanently remote', 'remote only', 'all-remote', 'distributed',
+                                'work from anywhere', 'location independent']),
+]
+
+def _trie_regex(keywords: List[str]) -> str:
+    """Regex alternation of keywords factored by common prefixes; a longer keyword is preferred over its prefix."""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+class KeywordGroups:
+    """
+    Keyword groups compiled into one pattern that finds every keyword occurrence in a single pass.
+
+    The longest keyword at a position is matched, and searching resumes one
+    character after each match start, so overlapping keywords are found.
+    Keywords that are a prefix of the matched one occur at the same position
+    too, so each keyword also lists its prefixes.
+    """
+
+    def __init__(self, groups):
+        """
+        Args:
+            groups: (group, text searched, keywords) tuples, as in CATEGORY_KEYWORDS
+        """
+        self.keyword_groups = {}
+        for group, scope, keywords in groups:
+            for keyword in keywords:
+                self.keyword_groups.setdefault(keyword, []).append((group, scope))
+        self.prefixes = {keyword: [other for other in self.keyword_groups if keyword.startswith(other)]
+                         for keyword in self.keyword_groups}
+        self.longest = max(len(keyword) for keyword in self.keyword_groups)
+        self.pattern = re.compile(_trie_regex(list(self.keyword_groups)))
+
+    def hits(self, combined: str, policy_end: int, pos: int = 0, endpos: Optional[int] = None) -> set:
+        """
+        Names of the groups with a keyword in their text.
+
+        Args:
+            combined: Lowercased policy type and details joined by a space
+            policy_end: Length of the policy type part
+            pos, endpos: Only keywords lying within combined[pos:endpos] are found
+        """
+        endpos = len(combined) if endpos is None else endpos
+        hits = set()
+        match = self.pattern.search(combined, pos, endpos)
+        while match:
+            start = match.start()
+            for keyword in self.prefixes[match.group()]:
+                for group, scope in self.keyword_groups[keyword]:
+                    if (scope == 'combined'
+                            or (scope == 'policy' and start + len(keyword) <= policy_end)
+                            or (scope == 'details' and start > policy_end)):
+                        hits.add(group)
+            match = self.pattern.search(combined, start + 1, endpos)
+        return hits
+
+_CATEGORY_KEYWORD_GROUPS = KeywordGroups(CATEGORY_KEYWORDS)
+# Only these can match past the policy type
+_CATEGORY_DETAILS_KEYWORD_GROUPS = KeywordGroups([group for group in CATEGORY_KEYWORDS if group[1] != 'policy'])
+
+# Groups that settle the category when found in the policy type (only 'policy' keywords can make it Full Office)
+_CATEGORY_DECIDED_BY_POLICY = {'full_office', 'unknown', 'role_dependent', 'limited_remote', 'flexible'}
+
 def map_to_category(policy_type: str, days_required: int, details: str) -> str:
     """
     Categorize work policy into simplified categories.
@@ -43,47 +143,53 @@ def map_to_category(policy_type: str, days_required: int, details: str) -> str:
     - Fully Remote: Truly remote-first companies (explicit remote-first/permanent remote)
     - Hybrid: 1-4 days in office, flexible, role-dependent, or unclear
     - Full Office: 5 days required in office
+
+    Keywords (CATEGORY_KEYWORDS) are found in one pass; the rules below apply in order.
     """
     policy_lower = policy_type.lower() if policy_type else ""
     details_lower = details.lower() if details else ""
-    combined = policy_lower + " " + details_lower
 
     # Full Office (5 days)
     if days_required >= 5:
         return "Full Office"
 
-    if any(keyword in policy_lower for keyword in ['5-day office', 'full-time office', 'five days']):
+    # The policy type is scanned first; the details only when it doesn't settle the category
+    combined = policy_lower + " " + details_lower
+    policy_end = len(policy_lower)
+    hits = _CATEGORY_KEYWORD_GROUPS.hits(combined, policy_end, 0, policy_end)
+    if not hits & _CATEGORY_DECIDED_BY_POLICY:
+        details_groups = _CATEGORY_DETAILS_KEYWORD_GROUPS
+        hits |= details_groups.hits(combined, policy_end, max(0, policy_end - details_groups.longest + 1))
+
+    if 'full_office' in hits:
         return "Full Office"
 
     # Categorize as Hybrid first for ambiguous cases
     # This prevents false positives in "Fully Remote"
 
     # Unknown/unclear policies → Hybrid
-    if any(keyword in policy_lower for keyword in ['unknown', 'unclear', 'unable to verify', 'no public data']):
+    if 'unknown' in hits:
         return "Hybrid"
 
     # Role/position/client dependent → Hybrid (varies by person)
-    if any(keyword in combined for keyword in ['role-dependent', 'role dependent', 'position-dependent', 'position dependent',
-                                                 'varies by role', 'varies by position', 'client-dependent', 'client dependent']):
+    if 'role_dependent' in hits:
         return "Hybrid"
 
     # Limited/partial remote → Hybrid
-    if any(keyword in policy_lower for keyword in ['limited remote', 'partial remote', 'some remote']):
+    if 'limited_remote' in hits:
         return "Hybrid"
 
     # Flexible/hybrid keywords → Hybrid
-    if any(keyword in policy_lower for keyword in ['flexible', 'hybrid', 'days in office', 'days per week']):
+    if 'flexible' in hits:
         return "Hybrid"
 
     # Healthcare clinical/administrative split → Hybrid
-    if 'clinical' in details_lower and 'administrative' in details_lower:
+    if 'clinical' in hits and 'administrative' in hits:
         return "Hybrid"
 
     # Now check for TRUE Fully Remote (must have explicit indicators)
     # Only categorize as Fully Remote if we have strong evidence
-    if any(keyword in policy_lower for keyword in ['remote-first', 'fully remote', 'fully-remote', 'permanent remote',
-                                                     'permanently remote', 'remote only', 'all-remote', 'distributed',
-                                                     'work from anywhere', 'location independent']):
+    if 'fully_remote' in hits:
         return "Fully Remote"
 
     # 1-4 days in office → Hybrid
@@ -264,7 +370,131 @@ def is_old_format(company: Dict[str, Any]) -> bool:
     # Default to old format if unclear
     return True
 
-def merge_research_data(source_dir: str) -> List[Dict[str, Any]]:
+def ingest_batch_file(filepath: Path) -> Tuple[List[Tuple[str, Dict[str, Any], bool]], int, str]:
+    """
+    Load and normalize one batch file (runs in a worker process when ingesting in parallel).
+
+    Returns: (list of (company name, normalized record, old format?) in file order,
+              number of Unknown/empty companies skipped, messages printed while loading)
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        companies, batch_date = load_json_file(filepath)
+
+    records = []
+    skipped = 0
+    for company in companies:
+        # Skip Unknown companies
+        company_name = company.get('company', company.get('company_name', 'Unknown'))
+
+        if company_name == 'Unknown' or not company_name:
+            skipped += 1
+            continue
+
+        # Normalize based on format
+        if is_old_format(company):
+            records.append((company_name, normalize_old_format(company), True))
+        else:
+            records.append((company_name, normalize_new_format(company, batch_date), False))
+
+    return records, skipped, output.getvalue()
+
+def ingest_batch_files(batch_files: List[Path], workers: Optional[int] = None) -> Iterator[tuple]:
+    """
+    ingest_batch_file() results in the order of batch_files.
+
+    Files are decoded and normalized in a process pool of `workers`
+    (default: one per CPU) for many files (see parallel.PARALLEL_MIN_FILES).
+    """
+    return ordered_pool_map(ingest_batch_file, batch_files, workers)
+
+def _normalizer_fingerprint() -> str:
+    """Hash of this module's source; cached records are redone when the normalization code changes."""
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+class BatchManifest:
+    """
+    SQLite manifest of ingested batch files, stored alongside the merged dataset.
+
+    For each file it keeps the size, modification time and content hash,
+    what loading it printed and skipped, the company names it contained and
+    their normalized records. Everything but the records is small, so a
+    re-run reads that index whole and fetches only the records that end up
+    in the merge. The manifest is reset when MANIFEST_VERSION or the
+    normalization code changes.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, sha256 TEXT, size INTEGER, '
+                         'mtime_ns INTEGER, skipped INTEGER, messages TEXT, companies TEXT)')
+            conn.execute('CREATE TABLE IF NOT EXISTS records (path TEXT, idx INTEGER, record TEXT, '
+                         'PRIMARY KEY (path, idx))')
+            stamp = json.dumps([MANIFEST_VERSION, _normalizer_fingerprint()])
+            row = conn.execute("SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+            if row is None or row[0] != stamp:
+                conn.execute('DELETE FROM files')
+                conn.execute('DELETE FROM records')
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('stamp', ?)", (stamp,))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:  # Commits, or rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def files(self) -> Dict[str, Dict[str, Any]]:
+        """Index entries by file path, without the records."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT path, sha256, size, mtime_ns, skipped, messages, companies FROM files')
+            return {
+                path: {'sha256': sha256, 'size': size, 'mtime_ns': mtime_ns, 'skipped': skipped,
+                       'messages': messages, 'companies': json.loads(companies)}
+                for path, sha256, size, mtime_ns, skipped, messages, companies in rows
+            }
+
+    def records(self, keys: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+        """Normalized records by (file path, position in file)."""
+        with self._connect() as conn:
+            return [json.loads(conn.execute('SELECT record FROM records WHERE path = ? AND idx = ?', key).fetchone()[0])
+                    for key in keys]
+
+    def update(self, stored: Dict[str, Dict[str, Any]], touched: Dict[str, Dict[str, Any]], present: List[str]):
+        """
+        In one transaction: store (re-)ingested files with their records, refresh the
+        size and modification time of touched files, and drop files no longer present.
+        """
+        with self._connect() as conn:
+            for path, entry in stored.items():
+                conn.execute('DELETE FROM records WHERE path = ?', (path,))
+                conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (path, entry['sha256'], entry['size'], entry['mtime_ns'], entry['skipped'],
+                              entry['messages'], json.dumps(entry['companies'])))
+                conn.executemany('INSERT INTO records VALUES (?, ?, ?)',
+                                 [(path, idx, json.dumps(record, ensure_ascii=False))
+                                  for idx, record in enumerate(entry['records'])])
+            for path, entry in touched.items():
+                conn.execute('UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?',
+                             (entry['size'], entry['mtime_ns'], path))
+            present = set(present)
+            for (path,) in conn.execute('SELECT path FROM files').fetchall():
+                if path not in present:
+                    conn.execute('DELETE FROM files WHERE path = ?', (path,))
+                    conn.execute('DELETE FROM records WHERE path = ?', (path,))
+
+def manifest_path_for(output_path) -> Path:
+    """The manifest stored alongside a merged dataset file."""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + '.manifest.sqlite')
+
+def merge_research_data(source_dir: str, workers: Optional[int] = None,
+                        manifest_path: Optional[Path] = None) -> List[Dict[str, Any]]:
     """
     Merge all research batch files from the source directory.
     Handles both old and new JSON formats.
@@ -272,6 +502,11 @@ def merge_research_data(source_dir: str) -> List[Dict[str, Any]]:
 
     Args:
         source_dir: Path to the forbes500 research directory
+        workers: Processes for decoding and normalizing files (default: one per CPU, 1 to
+            run serially). Results are applied in file order either way.
+        manifest_path: Optional BatchManifest file. Only new or changed batch files are
+            normalized again; the others are replayed from the manifest in the same
+            override order. Updated after the merge.
 
     Returns:
         List of all company records in unified format
@@ -305,40 +540,69 @@ def merge_research_data(source_dir: str) -> List[Dict[str, Any]]:
         'old_format': 0,
         'new_format': 0,
         'updated': 0,
-        'unknown_skipped': 0
+        'unknown_skipped': 0,
+        'reused': 0
     }
 
+    # Files unchanged since the manifest was written are replayed from it: same size and
+    # modification time, or failing that, the same content hash
+    manifest = BatchManifest(manifest_path) if manifest_path else None
+    known = manifest.files() if manifest else {}
+    entries = {}
+    touched = {}
+    changed = []
     for batch_file in all_batch_files:
+        key = str(batch_file)
+        file_stat = batch_file.stat()
+        entry = known.get(key)
+        if entry and (entry['size'], entry['mtime_ns']) == (file_stat.st_size, file_stat.st_mtime_ns):
+            entries[key] = entry
+            continue
+        digest = hashlib.sha256(batch_file.read_bytes()).hexdigest() if manifest else None
+        if entry and entry['sha256'] == digest:
+            entries[key] = touched[key] = dict(entry, size=file_stat.st_size, mtime_ns=file_stat.st_mtime_ns)
+            continue
+        changed.append((batch_file, digest, file_stat))
+    stats['reused'] = len(entries)
+
+    # New and changed files are decoded and normalized, in parallel for many of them
+    stored = {}
+    ingested = ingest_batch_files([batch_file for batch_file, _, _ in changed], workers)
+    for (batch_file, digest, file_stat), (records, skipped, load_messages) in zip(changed, ingested):
+        entries[str(batch_file)] = stored[str(batch_file)] = {
+            'sha256': digest,
+            'size': file_stat.st_size,
+            'mtime_ns': file_stat.st_mtime_ns,
+            'skipped': skipped,
+            'messages': load_messages,
+            'companies': [[company_name, old_format] for company_name, _, old_format in records],
+            'records': [normalized for _, normalized, _ in records],
+        }
+
+    # Results are applied one by one in the original file order, so later batches
+    # override earlier ones exactly as in a full serial merge. Entries point at
+    # (file, position) until the winners' records are looked up below.
+    for batch_file in all_batch_files:
+        key = str(batch_file)
+        entry = entries[key]
         print(f"Processing: {batch_file.name}")
-        companies, batch_date = load_json_file(batch_file)
+        print(entry['messages'], end='')
+        stats['unknown_skipped'] += entry['skipped']
 
         batch_count = 0
         updated_count = 0
-        for company in companies:
-            # Skip Unknown companies
-            company_name = company.get('company', company.get('company_name', 'Unknown'))
-
-            if company_name == 'Unknown' or not company_name:
-                stats['unknown_skipped'] += 1
-                continue
-
-            # Normalize based on format
-            if is_old_format(company):
-                normalized = normalize_old_format(company)
-                stats['old_format'] += 1
-            else:
-                normalized = normalize_new_format(company, batch_date)
-                stats['new_format'] += 1
+        for idx, (company_name, old_format) in enumerate(entry['companies']):
+            stats['old_format' if old_format else 'new_format'] += 1
 
             # Check if this is an update or new entry
             if company_name in all_companies:
                 # Update existing entry (cleanup results override earlier data)
-                all_companies[company_name] = normalized
+                all_companies[company_name] = (key, idx)
                 updated_count += 1
                 stats['updated'] += 1
             else:
                 # New entry
-                all_companies[company_name] = normalized
+                all_companies[company_name] = (key, idx)
                 batch_count += 1
 
         if updated_count > 0:
@@ -346,6 +610,12 @@ def merge_research_data(source_dir: str) -> List[Dict[str, Any]]:
         else:
             print(f"  ✓ Added {batch_count} companies")
 
+    from_manifest = [location for location in all_companies.values() if 'records' not in entries[location[0]]]
+    cached_records = dict(zip(from_manifest, manifest.records(from_manifest))) if from_manifest else {}
+    for company_name, (key, idx) in all_companies.items():
+        entry = entries[key]
+        all_companies[company_name] = entry['records'][idx] if 'records' in entry else cached_records[(key, idx)]
+
     print(f"\n{'='*60}")
     print(f"Merge Statistics:")
     print(f"  Total unique companies: {len(all_companies)}")
@@ -353,8 +623,13 @@ def merge_research_data(source_dir: str) -> List[Dict[str, Any]]:
     print(f"  New format processed: {stats['new_format']}")
     print(f"  Companies updated by cleanup: {stats['updated']}")
     print(f"  Unknown/empty skipped: {stats['unknown_skipped']}")
+    if manifest:
+        print(f"  Batch files reused from manifest: {stats['reused']}, normalized: {len(changed)}")
     print(f"{'='*60}\n")
 
+    if manifest:
+        manifest.update(stored, touched, list(entries))
+
     # Convert dict to list and sort by rank
     def get_sort_key(company):
         rank = company.get('rank', 999)
@@ -451,8 +726,8 @@ if __name__ == "__main__":
     print("="*60)
     print()
 
-    # Merge all data
-    merged_companies = merge_research_data(source_directory)
+    # Merge all data, re-normalizing only batch files changed since the last run
+    merged_companies = merge_research_data(source_directory, manifest_path=manifest_path_for(output_path))
 
     # Save to output file
     save_merged_data(merged_companies, output_path)
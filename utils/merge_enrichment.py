@@ -5,10 +5,30 @@ Merge enrichment results (HQ, industry, employees) into the top 100 enriched dat
 
 import json
 from pathlib import Path
-from typing import List, Dict, Any
-
-def load_enrichment_results(results_dir: str) -> Dict[str, Dict[str, Any]]:
-    """Load all enrichment batch results."""
+from typing import List, Dict, Any, Iterator, Optional
+
+try:
+    from utils.parallel import ordered_pool_map
+except ImportError:  # Run as a script: python3 utils/merge_enrichment.py
+    from parallel import ordered_pool_map
+
+def read_batch_file(batch_file: Path) -> List[Dict[str, Any]]:
+    """Decode one enrichment batch file (runs in a worker process when loading in parallel)."""
+    with open(batch_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def read_batch_files(batch_files: List[Path], workers: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """Decoded batch files in the order given, read in a process pool for many files."""
+    return ordered_pool_map(read_batch_file, batch_files, workers)
+
+def load_enrichment_results(results_dir: str, workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Load all enrichment batch results.
+
+    Files are decoded in a process pool of `workers` (default: one per CPU)
+    for many files (see parallel.PARALLEL_MIN_FILES), and applied in file order,
+    so a later batch still overrides an earlier one for the same company.
+    """
     results_path = Path(results_dir)
 
     if not results_path.exists():
@@ -20,10 +40,7 @@ def load_enrichment_results(results_dir: str) -> Dict[str, Dict[str, Any]]:
 
     print(f"Loading {len(batch_files)} batch result files...")
 
-    for batch_file in batch_files:
-        with open(batch_file, 'r', encoding='utf-8') as f:
-            batch_data = json.load(f)
-
+    for batch_data in read_batch_files(batch_files, workers):
         for company_data in batch_data:
             company_name = company_data['company']
             all_enrichments[company_name] = company_data
@@ -0,0 +1,140 @@
+"""
+Model routing for the Research Assistant.
+
+Simple lookups (one company, a short question, a small context) go to a
+faster, smaller model with a tight max_tokens; comparisons, syntheses and
+large contexts stay on the larger model. Thresholds and models come from
+RouterConfig, which can be read from environment variables. Latency per
+route (time to first token and total, from admission to the model call)
+and the time spent queued for a slot are logged and kept for stats().
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, Optional
+
+from utils.chatbot import CONTEXT_SEPARATOR, estimate_tokens
+from utils.rate_limit import Ticket
+from utils.telemetry import annotate, record
+
+logger = logging.getLogger(__name__)
+
+# Wording that asks for comparison, explanation or synthesis
+_COMPLEX_PATTERN = re.compile(
+    r'\b(?:compare|comparison|compared|versus|vs|differ|difference|differences|why|explain|analy[sz]e'
+    r'|analysis|summari[sz]e|summary|overall|patterns?|trends?|pros|cons|trade-?offs?|impact|relationship'
+    r'|correlat\w*|recommend\w*|implications?|between|across)\b'
+)
+
+
+@dataclass
+class Route:
+    name: str
+    model: str
+    max_tokens: int
+    reason: str
+
+
+@dataclass
+class RouterConfig:
+    """Models and thresholds; every field can be overridden with an ASSISTANT_<FIELD> variable."""
+
+    fast_model: str = "claude-3-5-haiku-20241022"
+    fast_max_tokens: int = 400
+    large_model: str = "claude-sonnet-4-20250514"
+    large_max_tokens: int = 1024
+    # A question is only simple if it stays within all of these
+    max_fast_companies: int = 1
+    max_fast_context_tokens: int = 450
+    max_fast_query_words: int = 14
+
+    @classmethod
+    def from_env(cls) -> 'RouterConfig':
+        config = cls()
+        for field in fields(cls):
+            value = os.environ.get(f"ASSISTANT_{field.name.upper()}")
+            if value is not None:
+                setattr(config, field.name, field.type(value) if callable(field.type) else value)
+        return config
+
+
+class ModelRouter:
+    """Pick a model per question and record latency per route."""
+
+    def __init__(self, config: Optional[RouterConfig] = None):
+        self.config = config or RouterConfig()
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Dict[str, list]] = {}
+
+    def route(self, query: str, context: str) -> Route:
+        """Route on the question's wording and the size of the packed context."""
+        config = self.config
+        companies = context.count(CONTEXT_SEPARATOR) + 1 if context else 0
+        context_tokens = estimate_tokens(context)
+        words = len(query.split())
+
+        if _COMPLEX_PATTERN.search(query.lower()):
+            reason = "comparison or synthesis wording"
+        elif companies > config.max_fast_companies:
+            reason = f"{companies} companies in context"
+        elif context_tokens > config.max_fast_context_tokens:
+            reason = f"{context_tokens} context tokens"
+        elif words > config.max_fast_query_words:
+            reason = f"{words}-word question"
+        else:
+            return Route('fast', config.fast_model, config.fast_max_tokens, "simple lookup")
+        return Route('large', config.large_model, config.large_max_tokens, reason)
+
+    def timed(self, route: Route, chunks: Iterator[str], ticket: Optional[Ticket] = None) -> Iterator[str]:
+        """
+        Pass a text stream through, recording time to first token and total time for the route.
+
+        With the call's limiter ticket (the one given to stream_text), both
+        are measured from its admission, and the time it spent queued for a
+        slot is recorded separately, so queueing under load does not show
+        up as model latency.
+        """
+        start = time.monotonic()
+        first = None
+        for chunk in chunks:
+            if first is None:
+                first = time.monotonic()
+            yield chunk
+        end = time.monotonic()
+
+        queue_wait = 0.0
+        if ticket is not None and ticket.admitted:
+            queue_wait = ticket.admitted_at - ticket.enqueued
+            start = max(start, ticket.admitted_at)
+        total = end - start
+        self._record(route, first - start if first is not None else total, total, queue_wait)
+
+    def _record(self, route: Route, ttft: float, total: float, queue_wait: float):
+        with self._lock:
+            latencies = self._latencies.setdefault(route.name, {'ttft': [], 'total': [], 'queue_wait': []})
+            latencies['ttft'].append(ttft)
+            latencies['total'].append(total)
+            latencies['queue_wait'].append(queue_wait)
+        record('llm.time_to_first_token', ttft)
+        record('llm.stream', total)
+        record('llm.queue_wait', queue_wait)
+        annotate(route=route.name, model=route.model)
+        logger.info("assistant route=%s model=%s reason=%r queue=%.2fs ttft=%.2fs total=%.2fs",
+                    route.name, route.model, route.reason, queue_wait, ttft, total)
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, mean latencies and mean queue wait per route."""
+        with self._lock:
+            return {
+                name: {
+                    'calls': len(values['total']),
+                    'mean_ttft': sum(values['ttft']) / len(values['ttft']),
+                    'mean_total': sum(values['total']) / len(values['total']),
+                    'mean_queue_wait': sum(values['queue_wait']) / len(values['queue_wait']),
+                }
+                for name, values in self._latencies.items()
+            }
@@ -0,0 +1,33 @@
+"""
+Ordered process-pool map for the data scripts.
+
+Used by merge_data.py and merge_enrichment.py to decode batch files in
+parallel while still applying them in file order.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional
+
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES = 32
+
+
+def ordered_pool_map(function: Callable[[Any], Any], items: List[Any], workers: Optional[int] = None) -> Iterator[Any]:
+    """
+    function(item) for each item, in the order of items.
+
+    Runs in a process pool of `workers` (default: one per CPU) when there
+    are at least PARALLEL_MIN_FILES items, else in this process. function
+    must be picklable, i.e. defined at module level.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(items) < PARALLEL_MIN_FILES:
+        for item in items:
+            yield function(item)
+        return
+
+    # A few chunks per worker keeps the pool busy without a round trip per item
+    chunksize = max(1, len(items) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(function, items, chunksize=chunksize)
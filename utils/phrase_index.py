@@ -0,0 +1,131 @@
+"""
+Positional phrase index over the free-text fields of the company data.
+
+Executive quotes, policy details and notes are indexed separately from
+the TF-IDF document, keeping the position and character offsets of every
+token. Exact phrases and proximity queries ("all these words within N
+tokens") are answered from the postings and return the matching snippet
+with its offsets in the original field text.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Indexed fields as (label, path into the company record)
+PHRASE_FIELDS = (
+    ('key_quote', ('key_quote',)),
+    ('details', ('work_policy', 'details')),
+    ('notes', ('notes',)),
+)
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+# Text inside double quotes, curly quotes, or single quotes that are not apostrophes
+_QUOTED_PATTERN = re.compile(r'"([^"]+)"|“([^”]+)”|(?<!\w)\'([^\']+)\'(?!\w)')
+
+
+def quoted_phrases(query: str) -> List[str]:
+    """Return the quoted passages of a query, in order."""
+    return [next(g for g in groups if g) for groups in _QUOTED_PATTERN.findall(query)]
+
+
+class PhraseIndex:
+    """Positional inverted index with exact phrase and proximity matching."""
+
+    def __init__(self, companies: List[Dict[str, Any]]):
+        self.fields: List[Tuple[int, str]] = []          # field id -> (row, field label)
+        self.texts: List[str] = []                       # field id -> original text
+        self.spans: List[List[Tuple[int, int]]] = []     # field id -> char span per token position
+        self.postings: Dict[str, Dict[int, List[int]]] = {}  # token -> {field id: positions}
+        self._build(companies)
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return [t.lower() for t in _TOKEN_PATTERN.findall(text)]
+
+    def _build(self, companies: List[Dict[str, Any]]):
+        for row, company in enumerate(companies):
+            for label, path in PHRASE_FIELDS:
+                value = company
+                for key in path:
+                    value = value.get(key, {}) if isinstance(value, dict) else {}
+                if not isinstance(value, str) or not value.strip():
+                    continue
+
+                field_id = len(self.fields)
+                self.fields.append((row, label))
+                self.texts.append(value)
+                spans = []
+                for position, match in enumerate(_TOKEN_PATTERN.finditer(value)):
+                    spans.append(match.span())
+                    self.postings.setdefault(match.group(0).lower(), {}).setdefault(field_id, []).append(position)
+                self.spans.append(spans)
+
+    def _match(self, field_id: int, first: int, last: int) -> Dict[str, Any]:
+        row, label = self.fields[field_id]
+        start = self.spans[field_id][first][0]
+        end = self.spans[field_id][last][1]
+        return {
+            'row': row,
+            'field': label,
+            'start': start,
+            'end': end,
+            'text': self.texts[field_id][start:end],
+        }
+
+    def _common_fields(self, tokens: List[str]) -> List[int]:
+        """Field ids containing every token, rarest token first to keep the intersection small."""
+        lists = [self.postings.get(t) for t in tokens]
+        if not lists or any(p is None for p in lists):
+            return []
+        lists.sort(key=len)
+        common = set(lists[0])
+        for postings in lists[1:]:
+            common.intersection_update(postings)
+        return sorted(common)
+
+    def phrase(self, text: str) -> List[Dict[str, Any]]:
+        """All occurrences of the exact token sequence, in dataset order."""
+        tokens = self._tokens(text)
+        matches = []
+        for field_id in self._common_fields(tokens):
+            position_sets = [set(self.postings[t][field_id]) for t in tokens[1:]]
+            for start in self.postings[tokens[0]][field_id]:
+                if all(start + i + 1 in positions for i, positions in enumerate(position_sets)):
+                    matches.append(self._match(field_id, start, start + len(tokens) - 1))
+        return matches
+
+    def near(self, text: str, window: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        The shortest span per field containing every token of text, in any order.
+
+        Only spans of at most window tokens count (default: the number of
+        distinct tokens plus three).
+        """
+        tokens = list(dict.fromkeys(self._tokens(text)))
+        if window is None:
+            window = len(tokens) + 3
+
+        matches = []
+        for field_id in self._common_fields(tokens):
+            # Minimum window over the merged, sorted positions of all tokens
+            events = sorted((p, i) for i, t in enumerate(tokens) for p in self.postings[t][field_id])
+            counts = [0] * len(tokens)
+            covered = 0
+            best = None
+            left = 0
+            for right_pos, right_tok in events:
+                if counts[right_tok] == 0:
+                    covered += 1
+                counts[right_tok] += 1
+                while covered == len(tokens):
+                    left_pos, left_tok = events[left]
+                    if best is None or right_pos - left_pos < best[1] - best[0]:
+                        best = (left_pos, right_pos)
+                    counts[left_tok] -= 1
+                    if counts[left_tok] == 0:
+                        covered -= 1
+                    left += 1
+            if best is not None and best[1] - best[0] + 1 <= window:
+                matches.append(self._match(field_id, best[0], best[1]))
+        return matches
@@ -0,0 +1,235 @@
+"""
+Admission control for model calls, shared by all sessions in the process.
+
+A token bucket caps the request rate (a sustained rate plus a burst), and
+a concurrency limit caps the calls in flight. Calls that can't start at
+once wait in a per-session FIFO. Sessions are served round-robin, so a
+user who sends several messages at once can't push everyone else back.
+Each call holds a Ticket, which reports its queue position and an
+estimated wait that the UI can show.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average and up to `burst` at once (callers lock)."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class Ticket:
+    """A call's place in the queue; admitted once it may start, released when it is done."""
+
+    def __init__(self, limiter: 'FairLimiter', session: Hashable):
+        self.session = session
+        self.enqueued = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self.cancelled = False
+        self.released = False
+        self._limiter = limiter
+        self._decided = threading.Event()
+
+    @property
+    def admitted(self) -> bool:
+        return self.admitted_at is not None
+
+    @property
+    def pending(self) -> bool:
+        return not self._decided.is_set()
+
+    def wait_decided(self, timeout: Optional[float] = None) -> bool:
+        """Block until the ticket is admitted or cancelled (without cancelling it on timeout)."""
+        return self._decided.wait(timeout)
+
+    def position(self) -> int:
+        """1-based place in the service order, 0 once admitted or cancelled."""
+        return self._limiter.position(self)
+
+    def estimated_wait(self) -> float:
+        """Rough seconds until admission, from the position, the rate and recent call durations."""
+        return self._limiter.estimated_wait(self)
+
+    def release(self):
+        self._limiter.release(self)
+
+
+class FairLimiter:
+    """Process-wide token-bucket rate limit and concurrency limit with round-robin session queues."""
+
+    def __init__(self, max_concurrent: int = 4, rate: Optional[float] = None, burst: Optional[float] = None,
+                 default_call_seconds: float = 5.0):
+        """
+        Args:
+            max_concurrent: Calls allowed in flight at once
+            rate: Calls per second on average (None for no rate limit)
+            burst: Calls that may start at once after an idle period (defaults to one second's worth)
+            default_call_seconds: Assumed call duration for wait estimates until calls have been timed
+        """
+        self.max_concurrent = max_concurrent
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self._queues: 'OrderedDict[Hashable, deque]' = OrderedDict()
+        self._in_flight = 0
+        self._call_seconds = default_call_seconds
+        self._cond = threading.Condition()
+        self._counters = {'admitted': 0, 'timed_out': 0, 'max_queued': 0, 'wait_seconds': 0.0}
+
+    def enqueue(self, session: Optional[Hashable] = None) -> Ticket:
+        """Queue a call for session (None: a queue of its own) and admit it at once if possible."""
+        with self._cond:
+            ticket = Ticket(self, session if session is not None else object())
+            self._queues.setdefault(ticket.session, deque()).append(ticket)
+            queued = sum(len(q) for q in self._queues.values())
+            self._counters['max_queued'] = max(self._counters['max_queued'], queued)
+            self._dispatch()
+            return ticket
+
+    def _dispatch(self):
+        """Admit queued tickets round-robin while a slot and a rate token are free (lock held)."""
+        admitted = False
+        while self._queues and self._in_flight < self.max_concurrent:
+            if self.bucket is not None and not self.bucket.try_take():
+                break
+            session, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            if queue:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            ticket.admitted_at = time.monotonic()
+            self._in_flight += 1
+            self._counters['admitted'] += 1
+            self._counters['wait_seconds'] += ticket.admitted_at - ticket.enqueued
+            ticket._decided.set()
+            admitted = True
+        if admitted:
+            self._cond.notify_all()
+
+    def wait(self, ticket: Ticket, timeout: Optional[float] = None) -> bool:
+        """Block until ticket is admitted; on timeout it is removed from the queue and False returned."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not ticket.admitted:
+                if ticket.cancelled:
+                    return False
+                self._dispatch()
+                if ticket.admitted:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._cancel(ticket)
+                    self._counters['timed_out'] += 1
+                    return False
+                # Wake up for the next rate token even if no call finishes
+                refill = self.bucket.time_until_token() if self.bucket is not None else None
+                waits = [w for w in (remaining, refill) if w is not None]
+                self._cond.wait(max(min(waits), 0.001) if waits else None)
+            return True
+
+    def _cancel(self, ticket: Ticket):
+        queue = self._queues.get(ticket.session)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.session]
+        ticket.cancelled = True
+        ticket._decided.set()
+        self._cond.notify_all()
+
+    def release(self, ticket: Ticket):
+        """Free an admitted ticket's slot (or withdraw a queued one); safe to call twice."""
+        with self._cond:
+            if ticket.released:
+                return
+            ticket.released = True
+            if not ticket.admitted:
+                self._cancel(ticket)
+                return
+            self._in_flight -= 1
+            # Moving average of call durations, for wait estimates
+            self._call_seconds += 0.2 * (time.monotonic() - ticket.admitted_at - self._call_seconds)
+            self._dispatch()
+            self._cond.notify_all()
+
+    def take_token(self, timeout: Optional[float] = None) -> bool:
+        """Take a rate token outside the queue, for a retry of a call that already holds a slot."""
+        if self.bucket is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self.bucket.try_take():
+                wait = self.bucket.time_until_token()
+                if deadline is not None:
+                    if time.monotonic() + wait > deadline:
+                        return False
+                self._cond.wait(max(wait, 0.001))
+            return True
+
+    def position(self, ticket: Ticket) -> int:
+        with self._cond:
+            queue = self._queues.get(ticket.session)
+            if queue is None or ticket not in queue:
+                return 0
+            index = queue.index(ticket)
+            # Earlier rounds serve up to `index` tickets per session; in this round, sessions ahead go first
+            ahead = 0
+            for session, other in self._queues.items():
+                ahead += min(len(other), index)
+                if session == ticket.session:
+                    break
+                if len(other) > index:
+                    ahead += 1
+            else:
+                return 0
+            for session, other in reversed(self._queues.items()):
+                if session == ticket.session:
+                    break
+                ahead += min(len(other), index)
+            return ahead + 1
+
+    def estimated_wait(self, ticket: Ticket) -> float:
+        position = self.position(ticket)
+        if position == 0:
+            return 0.0
+        with self._cond:
+            behind_slots = position - (self.max_concurrent - self._in_flight)
+            slot_wait = math.ceil(behind_slots / self.max_concurrent) * self._call_seconds if behind_slots > 0 else 0.0
+            rate_wait = 0.0
+            if self.bucket is not None:
+                rate_wait = max(0.0, position - self.bucket.tokens) / self.bucket.rate
+        return max(slot_wait, rate_wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._counters)
+            stats['queued'] = sum(len(q) for q in self._queues.values())
+            stats['in_flight'] = self._in_flight
+            stats['mean_call_seconds'] = self._call_seconds
+        stats['mean_wait_seconds'] = stats['wait_seconds'] / stats['admitted'] if stats['admitted'] else 0.0
+        return stats
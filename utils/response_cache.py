@@ -0,0 +1,184 @@
+"""
+Persistent cache of Research Assistant answers.
+
+Answers are stored in a local SQLite file keyed on the normalized
+question, the retrieved companies (with a hash of their data), the model
+and the system prompt. Entries expire after a TTL and the least recently
+used ones are evicted once the store exceeds its size budget. Hit/miss
+counts and the generation time saved by hits are kept in the same file,
+so they cover all sessions and worker processes.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    answer TEXT NOT NULL,
+    latency REAL NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class CachedResponse:
+    answer: str
+    latency: float  # Seconds the original generation took
+    age: float      # Seconds since it was stored
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase the question and drop punctuation and extra whitespace, keeping word order."""
+    return ' '.join(re.findall(r'\w+\+?', query.lower()))
+
+
+def _digest(value: Any) -> str:
+    payload = value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def replay_stream(answer: str, chunk_words: int = 4) -> Iterator[str]:
+    """Yield a stored answer in small chunks, so it can go through st.write_stream like a live one."""
+    pieces = re.findall(r'\S+\s*|\s+', answer)
+    for i in range(0, len(pieces), chunk_words):
+        yield ''.join(pieces[i:i + chunk_words])
+
+
+class ResponseCache:
+    """SQLite-backed answer cache with TTL and size-based LRU eviction."""
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_bytes: int = 50_000_000):
+        """
+        Args:
+            path: SQLite file (created with its directory if missing)
+            ttl: Seconds an answer stays valid
+            max_bytes: Total answer size above which least recently used entries are evicted
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per call keeps this safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:  # Commits, or rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(query: str, results: List[Dict[str, Any]], model: str, system_prompt: str,
+                 history: str = '') -> str:
+        """
+        Key an answer on the question, the retrieved companies and their data, the model and prompt.
+
+        history identifies earlier conversation turns sent along (empty for a first question).
+        """
+        companies = [
+            [result['company'].get('company', ''), _digest(result['company']), result.get('matches', [])]
+            for result in results
+        ]
+        return _digest([normalize_query(query), companies, model, _digest(system_prompt), history])
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return the stored answer, or None on a miss or expired entry. Updates hit statistics."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT answer, latency, created FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl:
+                conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                row = None
+
+            if row is None:
+                self._add_stat(conn, 'misses', 1)
+                return None
+
+            conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+            self._add_stat(conn, 'hits', 1)
+            self._add_stat(conn, 'saved_seconds', row[1])
+            return CachedResponse(answer=row[0], latency=row[1], age=now - row[2])
+
+    def contains(self, key: str) -> bool:
+        """Whether an unexpired answer is stored, without counting a hit or miss."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT created FROM responses WHERE key = ?', (key,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def put(self, key: str, answer: str, latency: float):
+        """Store an answer with the time it took to generate, then evict to the size budget."""
+        now = time.time()
+        size = len(answer.encode('utf-8'))
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, answer, latency, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, answer, latency, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl,))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evict = []
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM responses WHERE key = ?', evict)
+
+    @staticmethod
+    def _add_stat(conn: sqlite3.Connection, name: str, amount: float):
+        conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM responses')
+            conn.execute('DELETE FROM stats')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            values = dict(conn.execute('SELECT name, value FROM stats'))
+            entries, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        hits = int(values.get('hits', 0))
+        misses = int(values.get('misses', 0))
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'bytes': total,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'saved_seconds': values.get('saved_seconds', 0.0),
+        }
@@ -0,0 +1,145 @@
+"""
+Typo-tolerant term lookup for the Research Assistant.
+
+SymSpellIndex maps a misspelled token to the closest term of the search
+vocabulary. Every vocabulary term is stored under all strings obtained by
+deleting up to max_distance characters from its prefix; a query generates
+its own deletes and only terms sharing one of them are compared with an
+edit-distance check. Lookup cost depends on the token length, not on the
+vocabulary size.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+def _delete_levels(word: str, max_distance: int) -> List[List[str]]:
+    """Strings obtained by deleting 0, 1, ... max_distance characters, one list per count."""
+    seen = {word}
+    levels = [[word]]
+    for _ in range(max_distance):
+        level = []
+        for w in levels[-1]:
+            if len(w) <= 1:
+                continue
+            for i in range(len(w)):
+                d = w[:i] + w[i + 1:]
+                if d not in seen:
+                    seen.add(d)
+                    level.append(d)
+        if not level:
+            break
+        levels.append(level)
+    return levels
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+
+    Returns max_distance + 1 as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    too_far = max_distance + 1
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        ca = a[i - 1]
+        for j in range(1, len(b) + 1):
+            cb = b[j - 1]
+            cost = 0 if ca == cb else 1
+            value = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (prev_prev is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb):
+                value = min(value, prev_prev[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return too_far
+        prev_prev, prev = prev, current
+    return min(prev[-1], too_far)
+
+
+def is_plausible_typo(token: str, term: str) -> bool:
+    """
+    Whether token looks like a misspelling of term rather than a different word.
+
+    Typing slips drop letters ("compnies"), swap them ("Salesfroce") or
+    double one ("compannies"); real words near a term usually differ in
+    letters ("commuting" / "computing") or add a prefix ("unchanged" /
+    "changed"). So token may lack letters of term, or have one letter
+    term lacks, but not both.
+    """
+    extra = Counter(token) - Counter(term)
+    if not extra:
+        return True
+    return sum(extra.values()) == 1 and not Counter(term) - Counter(token)
+
+
+class SymSpellIndex:
+    """Deletion-dictionary index resolving misspelled tokens to vocabulary terms."""
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 7):
+        """
+        Args:
+            max_distance: Largest edit distance a correction may have
+            prefix_length: Only this many leading characters are indexed,
+                which bounds the number of deletes per term
+        """
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.counts: Dict[str, int] = {}
+        self.deletes: Dict[str, List[str]] = {}
+
+    def build(self, term_counts: Dict[str, int]) -> 'SymSpellIndex':
+        """Index terms; the counts (e.g. document frequencies) break ties between corrections."""
+        self.counts = dict(term_counts)
+        self.deletes = {}
+        for term in self.counts:
+            for level in _delete_levels(term[:self.prefix_length], self.max_distance):
+                for d in level:
+                    self.deletes.setdefault(d, []).append(term)
+        return self
+
+    def lookup(self, token: str, max_distance: Optional[int] = None) -> Optional[str]:
+        """
+        Return the closest vocabulary term within max_distance edits, or None.
+
+        Known terms are returned unchanged. Ties go to the lower edit
+        distance, then the more frequent term, then alphabetical order.
+        """
+        if token in self.counts:
+            return token
+        if max_distance is None:
+            max_distance = self.max_distance
+        max_distance = min(max_distance, self.max_distance)
+        if max_distance <= 0:
+            return None
+
+        best = None
+        best_key = None
+        checked = set()
+        for n_deleted, level in enumerate(_delete_levels(token[:self.prefix_length], max_distance)):
+            # A term within distance d shares a delete reachable with at most d deletions,
+            # so deeper levels cannot beat the best match found so far
+            if best_key is not None and n_deleted > best_key[0]:
+                break
+            for d in level:
+                for term in self.deletes.get(d, ()):
+                    if term in checked:
+                        continue
+                    checked.add(term)
+                    limit = max_distance if best_key is None else best_key[0]
+                    distance = edit_distance(token, term, limit)
+                    if distance > limit:
+                        continue
+                    key = (distance, -self.counts[term], term)
+                    if best_key is None or key < best_key:
+                        best, best_key = term, key
+        return best
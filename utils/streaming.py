@@ -0,0 +1,142 @@
+"""
+Batching of streamed answer text for the Streamlit UI.
+
+st.write_stream sends one message to the browser per chunk, and each
+message carries the whole answer so far. Model deltas are a few
+characters each, so forwarding them one by one costs a message (and a
+re-render of the full text) per delta. coalesce_stream() joins deltas
+into larger chunks by time window or size before they reach the UI, and
+prefetch_stream() starts the model call in the background so the UI can
+show retrieved companies while the answer is on its way.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+from utils.rate_limit import Ticket
+from utils.telemetry import attach, current_trace
+
+DEFAULT_FLUSH_INTERVAL = 0.1  # Seconds
+DEFAULT_MAX_CHARS = 400
+
+
+def flush_interval_from_env() -> float:
+    """ASSISTANT_STREAM_FLUSH_MS, in seconds (0 disables coalescing)."""
+    value = os.environ.get("ASSISTANT_STREAM_FLUSH_MS")
+    return DEFAULT_FLUSH_INTERVAL if value is None else float(value) / 1000
+
+
+def coalesce_stream(chunks: Iterable[str], flush_interval: Optional[float] = None,
+                    max_chars: int = DEFAULT_MAX_CHARS) -> Iterator[str]:
+    """
+    Join text deltas and yield them at most once per flush_interval seconds.
+
+    The first delta is yielded at once so time to first token is not
+    delayed; later ones are held until the interval has passed or
+    max_chars have accumulated. Since a generator can only act when a
+    delta arrives, a slow stream still yields every delta as it comes.
+    """
+    if flush_interval is None:
+        flush_interval = flush_interval_from_env()
+
+    buffer = []
+    size = 0
+    last_flush = None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer.append(chunk)
+        size += len(chunk)
+        now = time.perf_counter()
+        if last_flush is None or now - last_flush >= flush_interval or size >= max_chars:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+            last_flush = now
+    if buffer:
+        yield ''.join(buffer)
+
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def prefetch_stream(chunks: Iterable[str], ticket: Optional[Ticket] = None) -> 'PrefetchedStream':
+    """
+    Start consuming chunks on a background thread now and return an iterator over them.
+
+    Lets the model call run while the caller renders other output; chunks
+    that arrive meanwhile are buffered. Exceptions raised by the stream
+    are re-raised from the returned iterator, so callers handle errors as
+    before. The caller's telemetry trace is attached to the thread.
+
+    Callers must close() the returned iterator when they are done with
+    it, normally in a finally block: if they stop early (a rerun, a stop,
+    an error), that ends the call after its next chunk and releases
+    ticket, the call's limiter ticket, so the slot is not held for an
+    answer nobody reads.
+    """
+    buffered: "queue.Queue" = queue.Queue()
+    stop = threading.Event()
+    parent = current_trace()
+
+    def produce():
+        if stop.is_set():
+            return
+        with attach(parent):
+            iterator = iter(chunks)
+            try:
+                for chunk in iterator:
+                    buffered.put(chunk)
+                    if stop.is_set():
+                        break
+            except BaseException as e:
+                buffered.put(_Failed(e))
+                return
+            finally:
+                close = getattr(iterator, 'close', None)
+                if close is not None:
+                    close()
+            buffered.put(_DONE)
+
+    threading.Thread(target=produce, name='prefetch-stream', daemon=True).start()
+    return PrefetchedStream(buffered, stop, ticket)
+
+
+class PrefetchedStream:
+    """Iterator over the chunks buffered by prefetch_stream(); close() cancels the call."""
+
+    def __init__(self, buffered: "queue.Queue", stop: threading.Event, ticket: Optional[Ticket] = None):
+        self._buffered = buffered
+        self._stop = stop
+        self._ticket = ticket
+        self.closed = False
+
+    def __iter__(self) -> 'PrefetchedStream':
+        return self
+
+    def __next__(self) -> str:
+        if self.closed:
+            raise StopIteration
+        item = self._buffered.get()
+        if item is _DONE:
+            self.close()
+            raise StopIteration
+        if isinstance(item, _Failed):
+            self.close()
+            raise item.error
+        return item
+
+    def close(self):
+        """Stop the background stream and release its ticket (withdrawn if still queued); safe to call twice."""
+        self.closed = True
+        self._stop.set()
+        if self._ticket is not None:
+            self._ticket.release()
@@ -0,0 +1,160 @@
+"""
+Latency instrumentation for the Research Assistant.
+
+Each assistant turn runs inside trace(), which makes a Trace current for
+the thread (Streamlit runs every session's script in its own thread).
+Code anywhere below it - the search engine, the LLM client - records
+timings with span() or record() and token counts with annotate(); with
+no current trace these calls do nothing. When the turn ends, the trace
+is appended as one JSON line to a metrics file, which summarize()
+aggregates into p50/p95 per span and metric:
+
+    python -m utils.telemetry [metrics.jsonl]
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+DEFAULT_METRICS_PATH = Path(__file__).parent.parent / ".cache" / "assistant_metrics.jsonl"
+
+_current = threading.local()
+
+
+class Trace:
+    """Span durations (seconds, summed per name) and attributes of one assistant turn."""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.started = time.time()
+        self.spans: Dict[str, float] = {}
+        self.attributes: Dict[str, Any] = dict(attributes)
+
+    def add(self, span_name: str, seconds: float):
+        self.spans[span_name] = self.spans.get(span_name, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace': self.name,
+            'timestamp': self.started,
+            'spans_ms': {name: round(seconds * 1000, 3) for name, seconds in self.spans.items()},
+            'attributes': self.attributes,
+        }
+
+
+class MetricsLog:
+    """Append-only JSON-lines file of finished traces."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else DEFAULT_METRICS_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def write(self, trace: Trace):
+        line = json.dumps(trace.to_dict(), default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def read(self, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return records[-last:] if last else records
+
+
+def current_trace() -> Optional[Trace]:
+    return getattr(_current, 'trace', None)
+
+
+@contextmanager
+def trace(name: str, log: Optional[MetricsLog] = None, **attributes: Any) -> Iterator[Trace]:
+    """Make a new Trace current for the block; on exit add its total time and write it to log."""
+    previous = current_trace()
+    t = Trace(name, **attributes)
+    _current.trace = t
+    start = time.perf_counter()
+    try:
+        yield t
+    finally:
+        t.add('total', time.perf_counter() - start)
+        _current.trace = previous
+        if log is not None:
+            log.write(t)
+
+
+@contextmanager
+def attach(t: Optional[Trace]) -> Iterator[None]:
+    """Make an existing trace current in this thread, for work handed off to a helper thread."""
+    previous = current_trace()
+    _current.trace = t
+    try:
+        yield
+    finally:
+        _current.trace = previous
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the block into the current trace (no-op without one)."""
+    t = current_trace()
+    if t is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        t.add(name, time.perf_counter() - start)
+
+
+def record(name: str, seconds: float):
+    """Add an externally measured duration to the current trace."""
+    t = current_trace()
+    if t is not None:
+        t.add(name, seconds)
+
+
+def annotate(**attributes: Any):
+    """Set attributes (token counts, route, cache hit, ...) on the current trace."""
+    t = current_trace()
+    if t is not None:
+        t.attributes.update(attributes)
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Count, p50 and p95 of every span (ms) and numeric attribute across traces."""
+    values: Dict[str, List[float]] = {}
+    for r in records:
+        for name, ms in r.get('spans_ms', {}).items():
+            values.setdefault(f"{name} (ms)", []).append(ms)
+        for name, value in r.get('attributes', {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values.setdefault(name, []).append(value)
+    return {
+        name: {
+            'count': len(samples),
+            'p50': float(np.percentile(samples, 50)),
+            'p95': float(np.percentile(samples, 95)),
+        }
+        for name, samples in sorted(values.items())
+    }
+
+
+def main(argv: List[str]):
+    log = MetricsLog(argv[1] if len(argv) > 1 else None)
+    records = log.read()
+    print(f"{len(records)} traces in {log.path}")
+    print(f"{'metric':<36}{'count':>7}{'p50':>11}{'p95':>11}")
+    for name, stats in summarize(records).items():
+        print(f"{name:<36}{stats['count']:>7}{stats['p50']:>11.1f}{stats['p95']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
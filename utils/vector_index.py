@@ -0,0 +1,151 @@
+"""
+Offline dense-vector search for the Research Assistant.
+
+HashedNgramEmbedder turns text into fixed-size vectors from hashed
+character n-grams (no network, no GPU, numpy only). IVFIndex is an
+inverted-file approximate nearest-neighbor index: vectors are clustered
+with k-means and a query only scores the clusters closest to it.
+"""
+
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class HashedNgramEmbedder:
+    """Embed text as IDF-weighted sums of hashed character n-gram vectors."""
+
+    def __init__(self, dim: int = 256, ngram_range: tuple = (3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.idf: Dict[str, float] = {}
+        self.default_idf = 1.0
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        return re.findall(r'\w+', text.lower())
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        """Signed feature-hashing of the token's character n-grams (memoized per token)."""
+        vec = self._token_vectors.get(token)
+        if vec is not None:
+            return vec
+
+        vec = np.zeros(self.dim, dtype=np.float32)
+        padded = f"<{token}>"
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(max(1, len(padded) - n + 1)):
+                h = zlib.crc32(padded[i:i + n].encode('utf-8'))
+                vec[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        self._token_vectors[token] = vec
+        return vec
+
+    def fit(self, documents: List[str]) -> 'HashedNgramEmbedder':
+        """Learn token IDF weights so common words contribute less."""
+        df = Counter()
+        for doc in documents:
+            df.update(set(self._tokenize(doc)))
+        n_docs = max(len(documents), 1)
+        self.idf = {token: math.log((1 + n_docs) / (1 + count)) + 1.0 for token, count in df.items()}
+        self.default_idf = math.log(1 + n_docs) + 1.0
+        return self
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text as an L2-normalized float32 vector."""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token, count in Counter(self._tokenize(text)).items():
+            vec += (count * self.idf.get(token, self.default_idf)) * self._token_vector(token)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a preallocated (n, dim) float32 matrix."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.embed(text)
+        return matrix
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over L2-normalized vectors (inner-product search).
+
+    Vectors are grouped by their nearest k-means centroid and stored
+    contiguously per list; a query scores only the n_probe closest lists.
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 16,
+                 n_iter: int = 10, train_size: int = 20000, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+        self.centroids = None
+        self.list_ids: List[np.ndarray] = []
+        self.list_vectors: List[np.ndarray] = []
+
+    def build(self, vectors: np.ndarray) -> 'IVFIndex':
+        """Cluster the vectors and fill the inverted lists."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        n_lists = self.n_lists or max(1, int(math.sqrt(n)))
+        n_lists = min(n_lists, n)
+        rng = np.random.default_rng(self.seed)
+
+        # Spherical k-means on a sample
+        sample = vectors[rng.choice(n, size=min(n, self.train_size), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.where(norms > 0, norms, 1)
+
+        # Assign all vectors in blocks to bound the temporary score matrix
+        assign = np.empty(n, dtype=np.intp)
+        for start in range(0, n, 8192):
+            block = vectors[start:start + 8192]
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind='stable')
+        bounds = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        self.centroids = centroids
+        self.list_ids = [order[bounds[c]:bounds[c + 1]] for c in range(n_lists)]
+        self.list_vectors = [vectors[ids] for ids in self.list_ids]
+        return self
+
+    def probe(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Return the ids stored in the n_probe lists closest to the query."""
+        n_probe = min(n_probe or self.n_probe, len(self.list_ids))
+        nearest = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        return np.concatenate([self.list_ids[c] for c in nearest])
+
+    def search(self, query: np.ndarray, k: int = 5, n_probe: Optional[int] = None):
+        """Return (ids, scores) of the approximate top-k vectors by inner product."""
+        n_probe = min(n_probe or self.n_probe, len(self.list_ids))
+        nearest = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        ids = np.concatenate([self.list_ids[c] for c in nearest])
+        scores = np.concatenate([self.list_vectors[c] @ query for c in nearest])
+
+        k = min(k, len(ids))
+        if k == 0:
+            return ids, scores
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return ids[top], scores[top]
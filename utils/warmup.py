@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Cache warm-up for the assistant's suggested questions.
+
+First-time visitors mostly click the questions suggested under the chat
+input, so these are answered ahead of time after a deploy or a dataset
+change. warm_search() fills the engine's in-process search cache (app.py
+does this when it builds the engine). warm_responses() generates the
+full answers into the shared response cache. It follows the chat
+handler's steps for a first question in a new session, so the cache keys
+match the ones the app computes. Questions that already have a cached
+answer are skipped, so re-running only costs model calls after the data,
+prompt or model changed.
+
+Run at deploy time, with the same environment as the app:
+    ANTHROPIC_API_KEY=... python -m utils.warmup [--queries-file seeds.txt]
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from utils.aggregates import AggregateEngine
+from utils.chatbot import CompanySearchEngine, create_system_blocks, format_company_context, generate_response_prompt
+from utils.conversation import ConversationMemory
+from utils.llm_client import AssistantClient
+from utils.model_router import ModelRouter, RouterConfig
+from utils.response_cache import ResponseCache
+
+DATA_PATH = Path(__file__).parent.parent / "data" / "forbes500_rto_data_top100_enriched.json"
+DEFAULT_RESPONSE_CACHE_PATH = Path(__file__).parent.parent / ".cache" / "assistant_responses.sqlite"
+
+# Shown as suggestions under the chat input
+SUGGESTED_QUERIES = [
+    "Which tech companies are fully remote?",
+    "Compare Google and Microsoft",
+    "Who's tightening RTO?",
+]
+
+
+def seed_queries(path: Optional[str] = None) -> List[str]:
+    """Questions to warm: one per line of path, else ASSISTANT_WARMUP_QUERIES ('|'-separated), else the suggestions."""
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    elif os.environ.get("ASSISTANT_WARMUP_QUERIES"):
+        lines = os.environ["ASSISTANT_WARMUP_QUERIES"].split('|')
+    else:
+        return list(SUGGESTED_QUERIES)
+    return [line.strip() for line in lines if line.strip()]
+
+
+def warm_search(engine: CompanySearchEngine, queries: Iterable[str],
+                candidates: Union[np.ndarray, Iterable, None] = None) -> int:
+    """Run the chat handler's retrieval for each question so results are in the search cache."""
+    aggregates = AggregateEngine(engine)
+    warmed = 0
+    for query in queries:
+        retrieval_query = ConversationMemory().resolve_query(query, bool(engine.entity_matcher.find(query)))
+        if aggregates.answer(retrieval_query, candidates=candidates) is None:
+            engine.search(retrieval_query, top_k=8, candidates=candidates)
+            warmed += 1
+    return warmed
+
+
+def warm_responses(engine: CompanySearchEngine, response_cache: ResponseCache, client: AssistantClient,
+                   router: ModelRouter, queries: Iterable[str],
+                   candidates: Union[np.ndarray, Iterable, None] = None) -> Dict[str, str]:
+    """
+    Generate and store the answer to each question as a first turn of a session.
+
+    Returns the outcome per question: 'aggregate' (answered without the
+    model), 'no results', 'cached', 'generated', or 'failed: <error>'.
+    """
+    aggregates = AggregateEngine(engine)
+    outcomes = {}
+    for query in queries:
+        memory = ConversationMemory()
+        retrieval_query = memory.resolve_query(query, bool(engine.entity_matcher.find(query)))
+        if aggregates.answer(retrieval_query, candidates=candidates) is not None:
+            outcomes[query] = 'aggregate'
+            continue
+        results = engine.search(retrieval_query, top_k=8, candidates=candidates)
+        if not results:
+            outcomes[query] = 'no results'
+            continue
+
+        context = format_company_context(results, fragments=engine.context_fragments)
+        route = router.route(query, context)
+        system_blocks = create_system_blocks(engine.dataset_digest)
+        key = response_cache.make_key(query, results, route.model, json.dumps(system_blocks), memory.digest())
+        if response_cache.contains(key):
+            outcomes[query] = 'cached'
+            continue
+
+        start = time.perf_counter()
+        try:
+            ticket = client.enqueue()
+            answer = ''.join(router.timed(route, client.stream_text(
+                model=route.model,
+                max_tokens=route.max_tokens,
+                system=system_blocks,
+                messages=memory.messages(generate_response_prompt(query, context)),
+                ticket=ticket,
+            ), ticket=ticket))
+        except Exception as e:
+            outcomes[query] = f"failed: {type(e).__name__}"
+            continue
+        response_cache.put(key, answer, time.perf_counter() - start)
+        outcomes[query] = 'generated'
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute search results and answers for the suggested questions")
+    parser.add_argument('--queries-file', help="One question per line (default: ASSISTANT_WARMUP_QUERIES or the suggestions)")
+    parser.add_argument('--data', default=str(DATA_PATH))
+    parser.add_argument('--cache-path', default=os.environ.get("RESPONSE_CACHE_PATH", str(DEFAULT_RESPONSE_CACHE_PATH)))
+    args = parser.parse_args()
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        companies = json.load(f)
+    queries = seed_queries(args.queries_file)
+
+    # Builds the shared memory-mapped index too when SEARCH_INDEX_DIR is set
+    start = time.perf_counter()
+    engine = CompanySearchEngine(companies, index_dir=os.environ.get("SEARCH_INDEX_DIR"))
+    warmed = warm_search(engine, queries)
+    print(f"Search: engine built and {warmed} of {len(queries)} questions retrieved in "
+          f"{time.perf_counter() - start:.2f}s")
+
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("ANTHROPIC_API_KEY not set; skipping answer generation")
+        return
+
+    response_cache = ResponseCache(args.cache_path)
+    client = AssistantClient(api_key)
+    outcomes = warm_responses(engine, response_cache, client, ModelRouter(RouterConfig.from_env()), queries)
+    for query, outcome in outcomes.items():
+        print(f"  {outcome:<12} {query}")
+    print(f"Response cache: {response_cache.stats()['entries']} entries in {args.cache_path}")
+
+
+if __name__ == "__main__":
+    main()